@@ -1 +1,9 @@
 """Bot module initialization."""
+
+import os
+import sys
+
+# Project root on sys.path once, for `config` / `core` imports from any entrypoint
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
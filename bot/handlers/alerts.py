@@ -7,10 +7,6 @@ Telegram handlers for price alerts, stop-loss, and take-profit orders.
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from core.alerts import get_alert_manager, AlertType
 from core.polymarket_client import get_polymarket_client
 
@@ -24,10 +24,6 @@ from telegram.ext import (
     filters
 )
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from core.user_manager import get_user_manager
 
 
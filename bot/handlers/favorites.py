@@ -8,13 +8,10 @@ Uses index-based callbacks with context storage.
 from telegram import Update
 from telegram.ext import ContextTypes
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from core.polymarket_client import get_polymarket_client, SubMarket
 from core.favorites_db import get_favorites_db
 from bot.keyboards.inline import favorites_keyboard, outcome_keyboard
+from bot.handlers.trading import get_flow_state, get_nav
 
 
 async def favorites_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -70,9 +67,10 @@ async def fav_add_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = str(update.effective_user.id)
     
-    # Get market info from context
-    market = context.user_data.get('selected_market')
-    outcome = context.user_data.get('selected_outcome', 'Yes')
+    # Get market info from the buy-flow state
+    state = get_flow_state(context)
+    market = state.selected_market
+    outcome = state.selected_outcome
     
     if not market:
         await query.answer("⚠️ No market selected", show_alert=True)
@@ -102,7 +100,7 @@ async def fav_view_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer("📊 Loading market...")
     
     # Get index from callback: fv_0 -> 0
-    idx = int(query.data.split('_')[1])
+    idx = int(query.data.partition('_')[2])
     favorites = context.user_data.get('favorites', [])
     
     if idx >= len(favorites):
@@ -112,7 +110,11 @@ async def fav_view_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     fav = favorites[idx]
     
     client = get_polymarket_client()
-    market = await client.get_market_details(fav.market_id)
+    # Reuse the market if it's in the user's last listing (prices refresh below)
+    nav = get_nav(update, create=False)
+    market = nav.markets_by_id.get(fav.market_id) if nav else None
+    if market is None:
+        market = await client.get_market_details(fav.market_id)
     
     if not market:
         await query.edit_message_text(
@@ -132,9 +134,10 @@ async def fav_view_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         outcome_yes=market.outcome_yes,
         outcome_no=market.outcome_no,
     )
-    context.user_data['selected_sub_market'] = sub
-    context.user_data['selected_market'] = sub  # Legacy compat
-    context.user_data['selected_event'] = None  # No parent event
+    state = get_flow_state(context)
+    state.selected_sub_market = sub
+    state.selected_market = sub  # Legacy compat
+    state.selected_event = None  # No parent event
     
     # Refresh prices from CLOB
     yes_price = market.yes_price
@@ -192,7 +195,7 @@ async def fav_del_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     
     # Get index from callback: fd_0 -> 0
-    idx = int(query.data.split('_')[1])
+    idx = int(query.data.partition('_')[2])
     favorites = context.user_data.get('favorites', [])
     
     if idx >= len(favorites):
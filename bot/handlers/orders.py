@@ -7,11 +7,11 @@ Telegram handlers for open orders and order book display.
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from core.polymarket_client import get_polymarket_client, require_auth
+from bot.handlers.trading import get_flow_state
+from bot.handlers.wallet import invalidate_balance
+
+_ID_TAIL = 8  # order-id chars echoed in cancel buttons to catch stale lists
 
 
 async def orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -44,13 +44,16 @@ async def orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"   Size: {order['size']:.2f} | Filled: {filled_pct:.0f}%\n"
         text += f"   ID: <code>{order['order_id'][:12]}...</code>\n\n"
     
-    # Create cancel buttons
+    # Create cancel buttons. Order IDs (66 chars) don't fit Telegram's
+    # 64-byte callback_data, so buttons carry an index into user_data plus
+    # the ID's tail, which a button from an older /orders list won't match
+    context.user_data['open_order_ids'] = [order['order_id'] for order in orders[:5]]
     buttons = []
-    for order in orders[:5]:
+    for i, order in enumerate(orders[:5]):
         buttons.append([
             InlineKeyboardButton(
                 f"❌ Cancel {order['side'].upper()} @ {order['price']*100:.0f}¢",
-                callback_data=f"cancel_{order['order_id'][:32]}"
+                callback_data=f"cancel_{i}_{order['order_id'][-_ID_TAIL:]}"
             )
         ])
     
@@ -88,7 +91,13 @@ async def cancel_order_callback(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer("⏳ Cancelling...")
     
-    order_id = query.data.replace("cancel_", "")
+    order_ids = context.user_data.get('open_order_ids') or []
+    match = context.matches[0]
+    idx = int(match.group(1))
+    if idx >= len(order_ids) or order_ids[idx][-_ID_TAIL:] != match.group(2):
+        await query.edit_message_text("⚠️ Order list expired. Use /orders to refresh.")
+        return
+    order_id = order_ids[idx]
     
     client = await require_auth(update)
     if not client:
@@ -96,6 +105,7 @@ async def cancel_order_callback(update: Update, context: ContextTypes.DEFAULT_TY
     success = await client.cancel_order(order_id)
     
     if success:
+        invalidate_balance(update.effective_user.id)
         await query.edit_message_text(
             f"✅ <b>Order Cancelled</b>\n\n"
             f"Order <code>{order_id[:16]}...</code> has been cancelled.",
@@ -126,6 +136,8 @@ async def cancel_all_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not client:
         return
     count = await client.cancel_all_orders()
+    if count:
+        invalidate_balance(update.effective_user.id)
     
     await query.edit_message_text(
         f"✅ <b>Orders Cancelled</b>\n\n"
@@ -142,8 +154,8 @@ async def order_book_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     query = update.callback_query
     await query.answer("📖 Loading order book...")
     
-    # Get token_id from context
-    token_id = context.user_data.get('selected_token_id')
+    # Get token_id from the buy-flow state
+    token_id = get_flow_state(context).selected_token_id
     if not token_id:
         await query.edit_message_text(
             "❌ No token selected. Please select a market first.",
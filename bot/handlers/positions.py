@@ -12,16 +12,12 @@ Features:
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from config import Config
 from core.polymarket_client import get_polymarket_client, require_auth, Position
 from core.alerts import get_alert_manager, AlertType
+from bot.handlers.wallet import invalidate_balance
 from bot.keyboards.inline import (
-    positions_keyboard, position_detail_keyboard, sell_confirm_keyboard,
-    instant_sell_keyboard
+    positions_keyboard, sell_confirm_keyboard, instant_sell_keyboard
 )
 
 
@@ -97,7 +93,7 @@ async def positions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(text, parse_mode='HTML')
         return
     
-    mode_tag = "📝 PAPER" if Config.is_paper_mode() else "🔴 LIVE"
+    mode_tag = "📝 PAPER" if Config.PAPER_MODE else "🔴 LIVE"
     
     if active_positions:
         # Build active positions display
@@ -179,7 +175,7 @@ async def position_detail_callback(update: Update, context: ContextTypes.DEFAULT
     await query.answer()
     
     # Extract position index from callback: pos_0 -> 0
-    idx = int(query.data.split('_')[1])
+    idx = int(query.data.partition('_')[2])
     
     positions = context.user_data.get('positions', [])
     if idx >= len(positions):
@@ -316,9 +312,9 @@ async def instant_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     
     # Parse: isell_0_100
-    parts = query.data.split('_')
-    pos_index = int(parts[1])
-    percent = int(parts[2])
+    idx_s, _, arg = query.data.partition('_')[2].partition('_')
+    pos_index = int(idx_s)
+    percent = int(arg)
     
     pos = context.user_data.get('current_position')
     if not pos:
@@ -361,6 +357,7 @@ async def instant_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
         result = await client.sell_market(pos.token_id, percent=percent)
     
     if result.success:
+        invalidate_balance(update.effective_user.id)
         # Update position manager
         try:
             from core.position_manager import get_position_manager
@@ -421,7 +418,7 @@ async def instant_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
             text += f"{pnl_emoji} P&L      ${pnl:+.2f}\n"
             if result.order_id:
                 text += f"━━━━━━━━━━━━━━━━━━━━━\n🆔 <code>{result.order_id[:16]}...</code>\n"
-            text += f"\n<i>{'📝 Paper' if Config.is_paper_mode() else '💱 Live'}</i>"
+            text += f"\n<i>{'📝 Paper' if Config.PAPER_MODE else '💱 Live'}</i>"
     else:
         text = (
             f"❌ <b>Sell Failed</b>\n"
@@ -461,9 +458,8 @@ async def sell_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     # Parse: sell_0_100 or sell_0_c
-    parts = query.data.split('_')
-    pos_index = int(parts[1])
-    percent_str = parts[2]
+    idx_s, _, percent_str = query.data.partition('_')[2].partition('_')
+    pos_index = int(idx_s)
     
     if percent_str == 'c':
         # Ask for custom percentage
@@ -536,9 +532,9 @@ async def confirm_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer("⚡ Executing sell...")
     
     # Parse: csell_0_100
-    parts = query.data.split('_')
-    pos_index = int(parts[1])
-    percent = int(parts[2])
+    idx_s, _, arg = query.data.partition('_')[2].partition('_')
+    pos_index = int(idx_s)
+    percent = int(arg)
     
     pos = context.user_data.get('current_position')
     if not pos:
@@ -556,6 +552,7 @@ async def confirm_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
     result = await client.sell_market(pos.token_id, percent=percent)
     
     if result.success:
+        invalidate_balance(update.effective_user.id)
         # Update position manager
         try:
             from core.position_manager import get_position_manager
@@ -601,7 +598,7 @@ async def confirm_sell_callback(update: Update, context: ContextTypes.DEFAULT_TY
             f"{pnl_emoji} P&L      ${pnl:+.2f}\n"
             f"━━━━━━━━━━━━━━━━━━━━━\n"
             f"{order_tag}"
-            f"<i>{'📝 Paper trade' if Config.is_paper_mode() else '💱 Live trade'}</i>"
+            f"<i>{'📝 Paper trade' if Config.PAPER_MODE else '💱 Live trade'}</i>"
         )
     else:
         err = result.error or 'Unknown error'
@@ -767,7 +764,7 @@ async def stop_loss_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     # Parse: sl_0
-    pos_index = int(query.data.split('_')[1])
+    pos_index = int(query.data.partition('_')[2])
     
     pos = context.user_data.get('current_position')
     if not pos:
@@ -814,7 +811,7 @@ async def take_profit_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     await query.answer()
     
     # Parse: tp_0
-    pos_index = int(query.data.split('_')[1])
+    pos_index = int(query.data.partition('_')[2])
     
     pos = context.user_data.get('current_position')
     if not pos:
@@ -861,9 +858,9 @@ async def sl_set_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer("🛑 Setting stop loss...")
     
     # Parse: slset_0_35
-    parts = query.data.split('_')
-    pos_index = int(parts[1])
-    price_cents = int(parts[2])
+    idx_s, _, arg = query.data.partition('_')[2].partition('_')
+    pos_index = int(idx_s)
+    price_cents = int(arg)
     
     pos = context.user_data.get('sl_tp_position')
     if not pos:
@@ -931,9 +928,9 @@ async def tp_set_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer("🎯 Setting take profit...")
     
     # Parse: tpset_0_80
-    parts = query.data.split('_')
-    pos_index = int(parts[1])
-    price_cents = int(parts[2])
+    idx_s, _, arg = query.data.partition('_')[2].partition('_')
+    pos_index = int(idx_s)
+    price_cents = int(arg)
     
     pos = context.user_data.get('sl_tp_position')
     if not pos:
@@ -7,13 +7,10 @@ Handles /search and /info commands for finding markets.
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from config import Config
 from core.polymarket_client import get_polymarket_client
 from bot.keyboards.inline import search_results_keyboard, outcome_keyboard, search_prompt_keyboard
+from bot.handlers.trading import get_flow_state, get_nav, set_markets
 
 
 # Conversation states
@@ -49,7 +46,7 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    context.user_data['markets'] = markets
+    set_markets(get_nav(update), markets)
     context.user_data['search_query'] = query
     
     # Build results text
@@ -116,7 +113,7 @@ async def search_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return ConversationHandler.END
     
-    context.user_data['markets'] = markets
+    set_markets(get_nav(update), markets)
     context.user_data['search_query'] = query
     
     # Build results text
@@ -165,7 +162,7 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     market = markets[0]
-    context.user_data['selected_market'] = market
+    get_flow_state(context).selected_market = market
     
     # Get actual outcome labels
     oe_yes = getattr(market, 'outcome_yes', 'Yes')
@@ -234,7 +231,7 @@ async def hot_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Sort by volume
     markets.sort(key=lambda m: m.volume, reverse=True)
-    context.user_data['markets'] = markets
+    set_markets(get_nav(update), markets)
     
     text = "🔥 <b>Trending Markets</b>\n\n"
     
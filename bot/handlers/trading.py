@@ -6,89 +6,562 @@ Shows: Sport → Events (matches) → Sub-Markets (toss, top scorer, etc.) → Y
 Events sorted: 🔴 LIVE first → 🟢 Upcoming by date. Past events excluded.
 """
 
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
-from telegram.ext import ContextTypes, ConversationHandler
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if TYPE_CHECKING:
+    from telegram.ext import ContextTypes  # annotations only
 
 from config import Config
-from core.polymarket_client import get_polymarket_client, require_auth, event_status
+from core.cache import TTLCache
+from core.polymarket_client import (
+    require_auth,
+    parse_event_date, is_geo_block_error, SubMarket
+)
+from core.position_manager import calc_fee, get_position_manager
+from bot.messaging import answer_later, edit_message, reply_message, reply_or_edit, spawn
+from bot.handlers.wallet import invalidate_balance
 from bot.keyboards.inline import (
     category_keyboard, sports_keyboard, leagues_keyboard, events_keyboard,
     sub_markets_keyboard, outcome_keyboard, amount_keyboard,
-    buy_confirm_keyboard, markets_keyboard
+    buy_confirm_keyboard, markets_keyboard, AMOUNT_PRESETS
 )
 
 
 # Conversation states
 CUSTOM_AMOUNT = 0
+CONV_END = -1  # == ConversationHandler.END
+
+# Trading mode and limits come from env at startup — read them once
+_PAPER_MODE = Config.PAPER_MODE
+_MIN_USD = Config.MIN_TRADE_USD
+_MAX_USD = Config.MAX_TRADE_USD
+
+
+# sport → (emoji, UPPER label), built once from the known sports
+_SPORT_META = {s: (Config.get_sport_emoji(s), s.upper()) for s in Config.SPORT_EMOJIS}
+
+
+def _sport_meta(sport: str) -> Tuple[str, str]:
+    """(emoji, upper-case label) for a sport key."""
+    meta = _SPORT_META.get(sport)
+    if meta is None:
+        meta = (Config.get_sport_emoji(sport), sport.upper())
+    return meta
+
+
+def refresh_mode():
+    """Re-read trading mode and limits from Config (after a runtime change)."""
+    global _PAPER_MODE, _MIN_USD, _MAX_USD
+    _PAPER_MODE = Config.PAPER_MODE
+    _MIN_USD = Config.MIN_TRADE_USD
+    _MAX_USD = Config.MAX_TRADE_USD
+
+
+@dataclass(slots=True)
+class BuyFlowState:
+    """Per-user navigation state for the buy flow (stored in user_data['flow'])."""
+    category: str = ''
+    sport: str = 'sports'
+    selected_league_name: str = ''
+    selected_event: Optional[Any] = None
+    selected_event_index: int = 0
+    selected_sub_market: Optional[Any] = None
+    selected_market: Optional[Any] = None  # Legacy: read by favorites
+    selected_token_id: Optional[str] = None
+    selected_outcome: str = 'YES'
+    selected_price: float = 0.5
+    buy_amount: float = 0.0
+    market_info: Optional[Dict[str, str]] = None  # Built once per outcome pick, passed to buy_market
+
+
+def get_flow_state(context) -> BuyFlowState:
+    """Get (or create) the caller's buy-flow state."""
+    state = context.user_data.get('flow')
+    if state is None:
+        state = context.user_data['flow'] = BuyFlowState()
+    return state
+
+
+@dataclass(slots=True)
+class NavLists:
+    """Fetched lists the buy flow pages through (per user, kept in _nav_cache)."""
+    leagues: List[Any] = field(default_factory=list)
+    events: List[Any] = field(default_factory=list)
+    event_starts: array = field(default_factory=lambda: array('d'))  # epoch secs, parallel to events
+    event_ends: array = field(default_factory=lambda: array('d'))
+    markets: List[Any] = field(default_factory=list)
+    markets_by_id: Dict[str, Any] = field(default_factory=dict)  # condition_id -> market
+    markets_title: str = 'Markets'  # heading for pg_ pages of `markets`
+
+
+# Lists are bulky and only useful mid-flow: keep them out of user_data (and
+# the persistence pickle) in a bounded cache that forgets idle users. Keyed
+# by user like the indexes into them (BuyFlowState, evt_/mkt_ buttons), so
+# in a group one user's /buy can't re-point another user's buttons
+_nav_cache = TTLCache(maxsize=100_000, ttl=1800, touch_on_get=True)
+
+_SESSION_EXPIRED = "⏳ Session expired — use /buy to start over."
+
+
+def get_nav(update: Update, create: bool = True) -> Optional[NavLists]:
+    """Get the user's NavLists; with create=False, None means the session expired."""
+    user_id = update.effective_user.id
+    nav = _nav_cache.get(user_id)
+    if nav is None and create:
+        nav = NavLists()
+        _nav_cache[user_id] = nav
+    return nav
+
+
+def set_markets(nav: NavLists, markets: list, title: str = 'Markets'):
+    """Store a market list together with its condition_id index."""
+    nav.markets = markets
+    nav.markets_title = title
+    nav.markets_by_id = {m.condition_id: m for m in markets}
+
+
+def clear_nav_cache():
+    """Drop all cached navigation lists (on shutdown)."""
+    _nav_cache.clear()
+
+
+def _epoch(date_str: Optional[str]) -> float:
+    """Gamma date string → epoch seconds (+inf when missing/unparseable)."""
+    dt = parse_event_date(date_str)
+    if dt is None:
+        return float('inf')
+    # Same convention as event_status(): wall-clock values are UTC
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _set_events(nav: NavLists, events: list):
+    """Store events plus their start/end columns (dates parsed once per fetch)."""
+    nav.events = events
+    nav.event_starts = array('d', (_epoch(e.start_date) for e in events))
+    nav.event_ends = array('d', (_epoch(e.end_date) for e in events))
+
+
+def _classify(nav: NavLists) -> Tuple[int, int, List[str]]:
+    """
+    One pass over the date columns → (live_count, upcoming_count, statuses).
+    Statuses are per event ('live' / 'upcoming' / 'past', as event_status())
+    and are handed to events_keyboard so it doesn't re-parse dates.
+    """
+    now = time.time()
+    statuses = []
+    live_count = upcoming_count = 0
+    for start, end in zip(nav.event_starts, nav.event_ends):
+        if end < now:
+            statuses.append('past')
+        elif start <= now:
+            statuses.append('live')
+            live_count += 1
+        else:
+            statuses.append('upcoming')
+            upcoming_count += 1
+    return live_count, upcoming_count, statuses
+
+
+def _status_line(live_count: int, upcoming_count: int) -> str:
+    """'🔴 N live  🟢 M upcoming' header line."""
+    status_line = ""
+    if live_count:
+        status_line += f"🔴 {live_count} live  "
+    if upcoming_count:
+        status_line += f"🟢 {upcoming_count} upcoming"
+    return status_line
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SHARED FETCH CACHE
+# Category/sport listings are the same for every user — keep them for 30s
+# and coalesce concurrent misses so a burst of taps makes one API call.
+# ═══════════════════════════════════════════════════════════════════
+_markets_cache = TTLCache(maxsize=256, ttl=30)  # (category, limit) -> markets
+_sports_cache = TTLCache(maxsize=64, ttl=30)    # (kind, sport/series, limit) -> leagues/events
+_inflight: Dict[tuple, asyncio.Task] = {}  # key -> fetch task, dropped once it finishes
+
+
+async def _fill(cache: TTLCache, key: tuple, fetch):
+    result = await fetch()
+    if result:  # don't pin an empty/failed lookup for the whole TTL
+        cache[key] = result
+    return result
+
+
+def _fill_done(key: tuple, task: asyncio.Task):
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # every caller may have given up; don't log it as unretrieved
+
+
+async def _cached_fetch(cache: TTLCache, key: tuple, fetch):
+    """Return cache[key], else await fetch() once for all concurrent callers."""
+    result = cache.get(key)
+    if result is not None:
+        return result
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.create_task(_fill(cache, key, fetch))
+        task.add_done_callback(lambda t: _fill_done(key, t))
+    # shield: one caller cancelling must not cancel the fetch for the rest
+    return await asyncio.shield(task)
+
+
+def _get_category_markets(client, category: str, limit: int = 15):
+    return _cached_fetch(_markets_cache, (category, limit),
+                         lambda: client.search_markets(category, limit=limit))
+
+
+def _get_sports_leagues(client, sport: str):
+    return _cached_fetch(_sports_cache, ('leagues', sport),
+                         lambda: client.get_sports_leagues(sport))
+
+
+def _get_sports_events(client, sport: str, limit: int = 15):
+    return _cached_fetch(_sports_cache, ('events', sport, limit),
+                         lambda: client.get_sports_events(sport=sport, limit=limit))
+
+
+def _get_league_events(client, series_id: str, sport: str, limit: int = 15):
+    return _cached_fetch(_sports_cache, ('league', series_id, sport, limit),
+                         lambda: client.get_events_by_league(series_id=series_id, sport=sport, limit=limit))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LEAGUE PREFETCH
+# While the user reads the league list, warm the shared cache with the
+# top leagues' events so the league tap is served without another RTT.
+# A tap that lands mid-fetch joins it through _cached_fetch.
+# ═══════════════════════════════════════════════════════════════════
+_PREFETCH_LEAGUES = 5
+
+
+def _prefetch_league_events(client, leagues: list, sport: str):
+    """Start background event fetches for the first few leagues."""
+    for lg in leagues[:_PREFETCH_LEAGUES]:
+        spawn(_get_league_events(client, lg.series_id, sport))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PRICE PREFETCH
+# The market details view is almost always followed by an outcome tap,
+# which needs a live CLOB price. Start both sides' price fetches when
+# the view opens so that tap only waits on whatever is left of them.
+# ═══════════════════════════════════════════════════════════════════
+_PRICE_PREFETCH_TTL = 20.0  # secs; older prices are re-fetched
+_price_prefetch = TTLCache(maxsize=512, ttl=_PRICE_PREFETCH_TTL)  # user id -> {token_id: task}
+
+
+async def _fetch_price(client, token_id: str) -> float:
+    """Live price for a token, or 0.0 if the CLOB can't be reached."""
+    try:
+        return await client.get_price(token_id)
+    except Exception:
+        return 0.0
+
+
+def _prefetch_prices(user_id: int, client, sub):
+    """Start background price fetches for both outcomes of a sub-market."""
+    cancel_price_prefetch(user_id)
+    _price_prefetch.expire()
+    _price_prefetch[user_id] = {
+        token_id: asyncio.create_task(_fetch_price(client, token_id))
+        for token_id in (sub.yes_token_id, sub.no_token_id) if token_id
+    }
+
+
+async def _live_price(user_id: int, client, token_id: str) -> float:
+    """Live price for token_id — from a fresh prefetch when there is one."""
+    tasks = _price_prefetch.get(user_id) or {}  # expired entries read as missing
+    _price_prefetch.pop(user_id)
+    task = tasks.pop(token_id, None)
+    for other in tasks.values():
+        other.cancel()
+    if task is not None and not task.cancelled():
+        return await task
+    return await _fetch_price(client, token_id)
+
+
+def cancel_price_prefetch(user_id: int):
+    """Cancel untaken price fetches (user picked another market)."""
+    for task in _price_prefetch.pop(user_id, {}).values():
+        task.cancel()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MESSAGE TEMPLATES (built once at import, filled with str.format)
+# ═══════════════════════════════════════════════════════════════════
+_BUY_MENU_TEXT = (
+    "🛒 <b>Buy Position</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "Select a category to browse:"
+)
+
+_SELECT_SPORT_TEXT = (
+    "🏆 <b>Select Sport</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "Choose a sport to see matches:"
+)
+
+_CATEGORY_MARKETS_TMPL = (
+    "📊 <b>{category} Markets</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "Found {n} markets:"
+)
+
+_LEAGUES_TMPL = (
+    "{emoji} <b>{sport} Leagues</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "Found {n} leagues/tournaments:\n\n"
+    "<i>Select a league to see matches:</i>"
+)
+
+_EVENTS_TMPL = (
+    "{emoji} <b>{title}</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "{n} active matches\n"
+    "{status}\n\n"
+    "<i>Tap an event to see betting options</i>"
+)
+
+_EVENTS_BACK_TMPL = (
+    "{emoji} <b>{sport} Events</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "{n} active matches:"
+)
+
+_MARKETS_PAGE_TMPL = (
+    "📊 <b>{title}</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "{n} markets (Page {page}):"
+)
+
+_EVENTS_PAGE_TMPL = (
+    "{emoji} <b>{sport} Events</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "{n} matches (Page {page}):"
+)
+
+_MARKET_DETAILS_TMPL = (
+    "📊 <b>Market Details</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "📋 <b>{event_title}</b>\n"
+    "{sub_line}\n"
+    "💹 <b>Prices{live}:</b>\n"
+    "{price_text}\n"
+    "{extra}"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "{footer}"
+    "<b>Select your position:</b>"
+)
+
+_BACK_SUB_TMPL = (
+    "📊 <b>{title}</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "<b>Betting Options:</b>"
+)
+
+_SUBMKT_TMPL = (
+    "📊 <b>{title}</b>\n"
+    "{timing}\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "<b>Betting Options ({n}):</b>\n\n"
+    "<i>Select a market to trade:</i>"
+)
+
+_AMOUNT_TMPL = (
+    "💵 <b>Enter Amount</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "📋 {event_title}\n"
+    "🎯 <b>{sub_title}</b>\n"
+    "📍 Buying: {outcome} @ {price}\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "<b>Select amount (USD):</b>"
+)
+
+# Confirm screen is stitched from these fixed pieces with str.join
+_CONFIRM_HEAD = "⚡ <b>Confirm Buy</b>\n━━━━━━━━━━━━━━━━━━━━━\n📋 <b>"
+_CONFIRM_SUB = "</b>\n🎯 <b>"
+_CONFIRM_OUTCOME = "</b>\n\nOutcome   "
+_CONFIRM_PRICE = "\nPrice     $"
+_CONFIRM_AMOUNT = "\nAmount    $"
+_CONFIRM_SHARES = "\nShares    ~"
+_CONFIRM_MODE = "━━━━━━━━━━━━━━━━━━━━━\nMode: "
+_CONFIRM_FOOTER = "\n\n<i>🔥 Market order = instant execution</i>"
+
+_CUSTOM_AMOUNT_TMPL = "✏️ <b>Custom Amount</b>\n\nEnter amount in USD (min ${min:.0f}, max ${max:.0f}):"
+
+_BUY_DONE_TMPL = (
+    "✅ <b>Buy Executed!</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "📋 {event_title}\n"
+    "🎯 {sub_title}\n"
+    "📍 {outcome}\n\n"
+    "📦 {filled:.2f} shares @ {cents:.1f}¢\n"
+    "💵 Cost     ${cost:.2f}\n"
+    "{fee_lines}"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "{order_tag}"
+    "<i>{mode}</i>\n\n"
+    "/positions → view live P&L"
+)
+
+_BUY_FEE_LINES_TMPL = (
+    "💸 Fee      ~${fee:.2f}\n"
+    "💰 Total    ~${total:.2f}\n"
+)
+
+_GEO_BLOCK_TEXT = (
+    "🚫 <b>Trading Blocked (Geo-Restriction)</b>\n\n"
+    "Polymarket restricts trading from certain regions.\n"
+    "Your server IP is in a blocked region.\n\n"
+    "🌍 <b>Blocked:</b> US, Cuba, Iran, North Korea, Syria, "
+    "Russia, Belarus, Myanmar, Venezuela, Zimbabwe, France\n\n"
+    "💡 Deploy on a server in an allowed region."
+)
+
+_SIG_LABELS = {0: 'EOA', 1: 'Proxy/Magic', 2: 'GnosisSafe'}
+
+_BAD_SIG_TMPL = (
+    "❌ <b>Invalid Signature</b>\n\n"
+    "The order was rejected because the signature doesn't match.\n\n"
+    "<b>Your session config:</b>\n"
+    "• sig_type: {sig} ({label})\n"
+    "• funder: <code>{funder}...</code>\n\n"
+    "<b>Fix:</b>\n"
+    "• /disconnect → /connect again with correct wallet type\n"
+    "• Email/browser login → provide funder address (sig_type=1)\n"
+    "• MetaMask/EOA → skip funder (sig_type=0)\n\n"
+    "Use /debug_wallet for full config info."
+)
+
+_BUY_FAILED_TMPL = (
+    "❌ <b>Buy Failed</b>\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n\n"
+    "Error: {error}\n\n"
+    "Please try again."
+)
+
+
+@lru_cache(maxsize=256)
+def _markets_page_header(title: str, n: int, page: int) -> str:
+    """Rendered heading for one page of a market listing."""
+    return _MARKETS_PAGE_TMPL.format(title=title, n=n, page=page)
+
+
+@lru_cache(maxsize=1024)
+def _price_strs(price: float) -> Tuple[str, str]:
+    """Formatted (cents, dollars) for a price, e.g. 0.55 → ('55¢', '$0.55')."""
+    return f"{price * 100:.0f}¢", f"${price:.2f}"
+
+
+@lru_cache(maxsize=256)
+def _price_lines(oe_yes: str, oe_no: str, yes_price: float, no_price: float,
+                 with_dollars: bool = True) -> str:
+    """Two-line YES/NO price block (team names when the market has them)."""
+    if oe_yes != 'Yes' and oe_no != 'No':
+        labels = (f"🔵 {oe_yes}", f"🔴 {oe_no}")
+    else:
+        labels = ("✅ YES", "❌ NO")
+    lines = []
+    for label, price in zip(labels, (yes_price, no_price)):
+        cents, dollars = _price_strs(price)
+        line = f"   {label}: {cents}"
+        if with_dollars:
+            line += f" ({dollars})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _render_market_details(event_title: str, sub_title: str, price_text: str,
+                           extra: str = "", updated_at: str = "") -> str:
+    """Fill the Market Details template shared by the outcome-selection screens."""
+    return _MARKET_DETAILS_TMPL.format(
+        event_title=event_title,
+        sub_line=f"🎯 <b>{sub_title}</b>\n" if sub_title else "",
+        live=" (LIVE)" if updated_at else "",
+        price_text=price_text,
+        extra=extra,
+        footer=f"🔄 <i>Updated at {updated_at}</i>\n" if updated_at else "",
+    )
+
+
+def _render_confirm(event_title: str, sub_title: str, outcome: str, price: float,
+                    amount: float, fee_line: str, balance_line: str, footer: str = "") -> str:
+    """Build the Confirm Buy text (shared by preset and custom amounts)."""
+    shares = amount / price if price > 0 else 0
+    return "".join((
+        _CONFIRM_HEAD, event_title,
+        _CONFIRM_SUB, sub_title,
+        _CONFIRM_OUTCOME, outcome,
+        _CONFIRM_PRICE, f"{price:.4f}",
+        _CONFIRM_AMOUNT, f"{amount:.2f}",
+        _CONFIRM_SHARES, f"{shares:.2f}\n",
+        fee_line, balance_line,
+        _CONFIRM_MODE, "📝 PAPER" if _PAPER_MODE else "💱 LIVE",
+        footer,
+    ))
 
 
 async def buy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /buy command - start buy flow."""
-    text = (
-        "🛒 <b>Buy Position</b>\n"
-        "━━━━━━━━━━━━━━━━━━━━━\n\n"
-        "Select a category to browse:"
-    )
+    context.user_data['flow'] = BuyFlowState()
+    cancel_price_prefetch(update.effective_user.id)
+    _nav_cache.pop(update.effective_user.id)
+    _nav_cache.expire()
     
-    if update.callback_query:
-        await update.callback_query.edit_message_text(
-            text,
-            parse_mode='HTML',
-            reply_markup=category_keyboard()
-        )
-    else:
-        await update.message.reply_text(
-            text,
-            parse_mode='HTML',
-            reply_markup=category_keyboard()
-        )
+    await reply_or_edit(update, _BUY_MENU_TEXT, parse_mode='HTML', reply_markup=category_keyboard())
 
 
 async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle category selection."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    category = query.data.split('_')[1]  # cat_sports -> sports
-    context.user_data['category'] = category
+    category = context.matches[0].group(1)  # cat_sports -> sports
+    state.category = category
+    cancel_price_prefetch(update.effective_user.id)
     
     if category == 'sports':
-        text = (
-            "🏆 <b>Select Sport</b>\n"
-            "━━━━━━━━━━━━━━━━━━━━━\n\n"
-            "Choose a sport to see matches:"
-        )
-        await query.edit_message_text(
-            text,
+        await edit_message(
+            query,
+            _SELECT_SPORT_TEXT,
             parse_mode='HTML',
             reply_markup=sports_keyboard()
         )
     else:
         # For non-sports, search directly
-        client = get_polymarket_client()
+        client = context.bot_data['client']
         cat_query = 'entertainment' if category == 'ent' else category
-        markets = await client.search_markets(cat_query, limit=15)
-        context.user_data['markets'] = markets
+        markets = await _get_category_markets(client, cat_query)
+        set_markets(get_nav(update), markets, title=f"{category.title()} Markets")
         
         if not markets:
-            await query.edit_message_text(
+            await edit_message(
+                query,
                 f"📭 No active {category} markets found.\n\nTry /search <query>",
                 reply_markup=category_keyboard()
             )
             return
         
-        text = (
-            f"📊 <b>{category.title()} Markets</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"Found {len(markets)} markets:"
-        )
-        await query.edit_message_text(
+        text = _CATEGORY_MARKETS_TMPL.format(category=category.title(), n=len(markets))
+        await edit_message(
+            query,
             text,
             parse_mode='HTML',
+            disable_web_page_preview=True,
             reply_markup=markets_keyboard(markets)
         )
 
@@ -96,205 +569,192 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def sport_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle sport selection - fetch LEAGUES first, then events."""
     query = update.callback_query
-    await query.answer("🔍 Loading leagues...")
+    answer_later(query, "🔍 Loading leagues...")
+    state = get_flow_state(context)
     
-    sport = query.data.split('_')[1]  # sp_cricket -> cricket
-    context.user_data['sport'] = sport
+    sport = context.matches[0].group(1)  # sp_cricket -> cricket
+    state.sport = sport
     
-    sport_emoji = Config.get_sport_emoji(sport)
-    client = get_polymarket_client()
+    sport_emoji, sport_upper = _sport_meta(sport)
+    client = context.bot_data['client']
     
     # Try to fetch leagues/series for this sport
-    leagues = await client.get_sports_leagues(sport)
-    context.user_data['leagues'] = leagues
+    leagues = await _get_sports_leagues(client, sport)
+    nav = get_nav(update)
+    nav.leagues = leagues
     
     if leagues:
         # Show league selection
-        text = (
-            f"{sport_emoji} <b>{sport.upper()} Leagues</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"Found {len(leagues)} leagues/tournaments:\n\n"
-            f"<i>Select a league to see matches:</i>"
-        )
-        await query.edit_message_text(
+        text = _LEAGUES_TMPL.format(emoji=sport_emoji, sport=sport_upper, n=len(leagues))
+        await edit_message(
+            query,
             text,
             parse_mode='HTML',
             reply_markup=leagues_keyboard(leagues, sport)
         )
+        _prefetch_league_events(client, leagues, sport)
     else:
         # No leagues found (e.g., UFC uses tags) — fall back to all events
-        events = await client.get_sports_events(sport=sport, limit=15)
-        context.user_data['events'] = events
+        events = await _get_sports_events(client, sport)
+        _set_events(nav, events)
         
         if not events:
-            await query.edit_message_text(
-                f"📭 No active {sport.upper()} events found.\n\nTry /search {sport}",
+            await edit_message(
+                query,
+                f"📭 No active {sport_upper} events found.\n\nTry /search {sport}",
                 reply_markup=sports_keyboard()
             )
             return
         
-        # Count live vs upcoming
-        live_count = sum(1 for e in events if event_status(e.start_date, e.end_date) == 'live')
-        upcoming_count = len(events) - live_count
-        status_line = ""
-        if live_count:
-            status_line += f"🔴 {live_count} live  "
-        if upcoming_count:
-            status_line += f"🟢 {upcoming_count} upcoming"
-        
-        text = (
-            f"{sport_emoji} <b>{sport.upper()} Events</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"{len(events)} active matches\n"
-            f"{status_line}\n\n"
-            f"<i>Tap an event to see betting options</i>"
+        live_count, upcoming_count, statuses = _classify(nav)
+        text = _EVENTS_TMPL.format(
+            emoji=sport_emoji, title=f"{sport_upper} Events",
+            n=len(events), status=_status_line(live_count, upcoming_count)
         )
-        await query.edit_message_text(
+        await edit_message(
+            query,
             text,
             parse_mode='HTML',
-            reply_markup=events_keyboard(events)
+            reply_markup=events_keyboard(events, statuses=statuses)
         )
 
 
 async def league_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle league selection - fetch events for the selected league."""
     query = update.callback_query
-    await query.answer("🔍 Loading events...")
+    answer_later(query, "🔍 Loading events...")
+    state = get_flow_state(context)
     
-    sport = context.user_data.get('sport', 'sports')
-    sport_emoji = Config.get_sport_emoji(sport)
-    client = get_polymarket_client()
+    sport = state.sport
+    sport_emoji, sport_upper = _sport_meta(sport)
+    client = context.bot_data['client']
     
-    league_data = query.data  # lg_0, lg_1, or lg_all
-    league_key = league_data.split('_')[1]
+    league_key = context.matches[0].group(1)  # lg_0, lg_1, or lg_all
+    
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
     
     if league_key == 'all':
         # "All Events" — fetch without league filter
-        events = await client.get_sports_events(sport=sport, limit=15)
-        league_name = f"All {sport.upper()}"
+        events = await _get_sports_events(client, sport)
+        league_name = f"All {sport_upper}"
     else:
         # Fetch events for specific league
         idx = int(league_key)
-        leagues = context.user_data.get('leagues', [])
+        leagues = nav.leagues
         
         if idx >= len(leagues):
-            await query.edit_message_text("⚠️ League not found. Try again with /buy")
+            await edit_message(query, "⚠️ League not found. Try again with /buy")
             return
         
         league = leagues[idx]
         league_name = league.name
-        events = await client.get_events_by_league(
-            series_id=league.series_id,
-            sport=sport,
-            limit=15
-        )
+        events = await _get_league_events(client, league.series_id, sport)
     
-    context.user_data['events'] = events
-    context.user_data['selected_league_name'] = league_name
+    _set_events(nav, events)
+    state.selected_league_name = league_name
     
     if not events:
-        await query.edit_message_text(
+        await edit_message(
+            query,
             f"📭 No active events in <b>{league_name}</b>.\n\nTry another league or /search {sport}",
             parse_mode='HTML',
-            reply_markup=leagues_keyboard(context.user_data.get('leagues', []), sport)
+            reply_markup=leagues_keyboard(nav.leagues, sport)
         )
         return
     
-    # Count live vs upcoming
-    live_count = sum(1 for e in events if event_status(e.start_date, e.end_date) == 'live')
-    upcoming_count = len(events) - live_count
-    status_line = ""
-    if live_count:
-        status_line += f"🔴 {live_count} live  "
-    if upcoming_count:
-        status_line += f"🟢 {upcoming_count} upcoming"
-    
-    text = (
-        f"{sport_emoji} <b>{league_name}</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"{len(events)} active matches\n"
-        f"{status_line}\n\n"
-        f"<i>Tap an event to see betting options</i>"
+    live_count, upcoming_count, statuses = _classify(nav)
+    text = _EVENTS_TMPL.format(
+        emoji=sport_emoji, title=league_name,
+        n=len(events), status=_status_line(live_count, upcoming_count)
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
-        reply_markup=events_keyboard(events)
+        reply_markup=events_keyboard(events, statuses=statuses)
     )
 
 
 async def events_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle events pagination."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    page = int(query.data.split('_')[1])  # evp_1 -> 1
-    events = context.user_data.get('events', [])
-    sport = context.user_data.get('sport', 'sports')
-    sport_emoji = Config.get_sport_emoji(sport)
+    page = int(context.matches[0].group(1))  # evp_1 -> 1
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
+    events = nav.events
+    sport = state.sport
+    sport_emoji, sport_upper = _sport_meta(sport)
     
-    text = (
-        f"{sport_emoji} <b>{sport.upper()} Events</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"{len(events)} matches (Page {page + 1}):"
+    text = _EVENTS_PAGE_TMPL.format(
+        emoji=sport_emoji, sport=sport_upper, n=len(events), page=page + 1
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
-        reply_markup=events_keyboard(events, page=page)
+        reply_markup=events_keyboard(events, page=page, statuses=_classify(nav)[2])
     )
 
 
 async def event_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle event selection - show SUB-MARKETS."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
     # Get event by index
-    idx = int(query.data.split('_')[1])  # evt_0 -> 0
-    events = context.user_data.get('events', [])
+    idx = int(context.matches[0].group(1))  # evt_0 -> 0
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
+    events = nav.events
     
     if idx >= len(events):
-        await query.edit_message_text("⚠️ Event not found. Try again with /buy")
+        await edit_message(query, "⚠️ Event not found. Try again with /buy")
         return
     
     event = events[idx]
-    context.user_data['selected_event'] = event
-    context.user_data['selected_event_index'] = idx
+    state.selected_event = event
+    state.selected_event_index = idx
     
+    statuses = _classify(nav)[2]
     sub_markets = event.markets
     
     if not sub_markets:
-        await query.edit_message_text(
+        await edit_message(
+            query,
             f"📭 No betting options found for this event.\n\nTry another match.",
-            reply_markup=events_keyboard(events)
+            reply_markup=events_keyboard(events, statuses=statuses)
         )
         return
     
     # Build timing badge
-    st = event_status(event.start_date, event.end_date)
+    st = statuses[idx]
     if st == 'live':
         timing = "🔴 <b>LIVE</b>"
     elif st == 'upcoming':
         timing = "🟢 Upcoming"
-        from core.polymarket_client import parse_event_date
         dt = parse_event_date(event.start_date)
         if dt:
             timing += f" — {dt.strftime('%d %b %H:%M')} UTC"
     else:
         timing = ""
     
-    text = (
-        f"📊 <b>{event.title}</b>\n"
-        f"{timing}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"<b>Betting Options ({len(sub_markets)}):</b>\n\n"
-        f"<i>Select a market to trade:</i>"
-    )
+    text = _SUBMKT_TMPL.format(title=event.title, timing=timing, n=len(sub_markets))
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=sub_markets_keyboard(sub_markets, idx)
@@ -304,61 +764,42 @@ async def event_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def sub_market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle sub-market selection - show Yes/No."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    # Parse: sub_0_1 -> event_idx=0, sub_idx=1
-    parts = query.data.split('_')
-    event_idx = int(parts[1])
-    sub_idx = int(parts[2])
+    # Parse: sub_0_1 -> event_idx=0, sub_idx=1 (pattern guarantees digits)
+    e_s, s_s = context.matches[0].groups()
     
-    events = context.user_data.get('events', [])
-    if event_idx >= len(events):
-        await query.edit_message_text("⚠️ Event not found. Start over with /buy")
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
         return
     
-    event = events[event_idx]
-    sub_markets = event.markets
+    try:
+        event = nav.events[int(e_s)]
+    except IndexError:
+        await edit_message(query, "⚠️ Event not found. Start over with /buy")
+        return
     
-    if sub_idx >= len(sub_markets):
-        await query.edit_message_text("⚠️ Market not found. Start over with /buy")
+    try:
+        sub = event.markets[int(s_s)]
+    except IndexError:
+        await edit_message(query, "⚠️ Market not found. Start over with /buy")
         return
     
-    sub = sub_markets[sub_idx]
-    context.user_data['selected_sub_market'] = sub
-    context.user_data['selected_market'] = sub  # Legacy compatibility
+    state.selected_sub_market = sub
+    state.selected_market = sub  # Legacy compatibility
+    _prefetch_prices(update.effective_user.id, context.bot_data['client'], sub)
     
     # Get actual outcome labels (team names or Yes/No)
     oe_yes = getattr(sub, 'outcome_yes', 'Yes')
     oe_no = getattr(sub, 'outcome_no', 'No')
     
-    # Calculate implied probabilities
-    yes_prob = sub.yes_price * 100
-    no_prob = sub.no_price * 100
+    price_text = _price_lines(oe_yes, oe_no, sub.yes_price, sub.no_price)
+    text = _render_market_details(event.title, sub.group_item_title or sub.question, price_text)
     
-    # Use team names or Yes/No in display
-    if oe_yes != 'Yes' and oe_no != 'No':
-        price_text = (
-            f"   🔵 {oe_yes}: {yes_prob:.0f}¢ (${sub.yes_price:.2f})\n"
-            f"   🔴 {oe_no}: {no_prob:.0f}¢ (${sub.no_price:.2f})"
-        )
-    else:
-        price_text = (
-            f"   ✅ YES: {yes_prob:.0f}¢ (${sub.yes_price:.2f})\n"
-            f"   ❌ NO: {no_prob:.0f}¢ (${sub.no_price:.2f})"
-        )
-    
-    text = (
-        f"📊 <b>Market Details</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 <b>{event.title}</b>\n"
-        f"🎯 <b>{sub.group_item_title or sub.question}</b>\n\n"
-        f"💹 <b>Prices:</b>\n"
-        f"{price_text}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"<b>Select your position:</b>"
-    )
-    
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=outcome_keyboard(outcome_yes=oe_yes, outcome_no=oe_no)
@@ -368,20 +809,21 @@ async def sub_market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def refresh_prices_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Refresh live prices from CLOB and re-render market details."""
     query = update.callback_query
-    await query.answer("🔄 Refreshing prices...")
+    answer_later(query, "🔄 Refreshing prices...")
+    state = get_flow_state(context)
 
-    sub = context.user_data.get('selected_sub_market')
-    event = context.user_data.get('selected_event')
+    sub = state.selected_sub_market
+    event = state.selected_event
 
     if not sub:
-        await query.edit_message_text("⚠️ Market not found. Start over with /buy")
+        await edit_message(query, "⚠️ Market not found. Start over with /buy")
         return
 
     # Fetch live prices from CLOB
     yes_price = sub.yes_price
     no_price = sub.no_price
     try:
-        client = get_polymarket_client()
+        client = context.bot_data['client']
         if sub.yes_token_id:
             live_yes = await client.get_price(sub.yes_token_id)
             if live_yes > 0 and live_yes != 0.5:
@@ -401,36 +843,17 @@ async def refresh_prices_callback(update: Update, context: ContextTypes.DEFAULT_
     oe_yes = getattr(sub, 'outcome_yes', 'Yes')
     oe_no = getattr(sub, 'outcome_no', 'No')
 
-    yes_prob = yes_price * 100
-    no_prob = no_price * 100
-
-    if oe_yes != 'Yes' and oe_no != 'No':
-        price_text = (
-            f"   🔵 {oe_yes}: {yes_prob:.0f}¢ (${yes_price:.2f})\n"
-            f"   🔴 {oe_no}: {no_prob:.0f}¢ (${no_price:.2f})"
-        )
-    else:
-        price_text = (
-            f"   ✅ YES: {yes_prob:.0f}¢ (${yes_price:.2f})\n"
-            f"   ❌ NO: {no_prob:.0f}¢ (${no_price:.2f})"
-        )
-
-    import datetime
+    price_text = _price_lines(oe_yes, oe_no, yes_price, no_price)
     now = datetime.datetime.now().strftime("%H:%M:%S")
-
-    text = (
-        f"📊 <b>Market Details</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 <b>{event.title if event else sub.question}</b>\n"
-        f"🎯 <b>{sub.group_item_title or sub.question}</b>\n\n"
-        f"💹 <b>Prices (LIVE):</b>\n"
-        f"{price_text}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"🔄 <i>Updated at {now}</i>\n"
-        f"<b>Select your position:</b>"
+    text = _render_market_details(
+        event.title if event else sub.question,
+        sub.group_item_title or sub.question,
+        price_text,
+        updated_at=now
     )
 
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=outcome_keyboard(outcome_yes=oe_yes, outcome_no=oe_no)
@@ -440,44 +863,44 @@ async def refresh_prices_callback(update: Update, context: ContextTypes.DEFAULT_
 async def back_events_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Go back to events list."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    events = context.user_data.get('events', [])
-    sport = context.user_data.get('sport', 'sports')
-    sport_emoji = Config.get_sport_emoji(sport)
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
+    events = nav.events
+    sport = state.sport
+    sport_emoji, sport_upper = _sport_meta(sport)
     
-    text = (
-        f"{sport_emoji} <b>{sport.upper()} Events</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"{len(events)} active matches:"
-    )
+    text = _EVENTS_BACK_TMPL.format(emoji=sport_emoji, sport=sport_upper, n=len(events))
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
-        reply_markup=events_keyboard(events)
+        reply_markup=events_keyboard(events, statuses=_classify(nav)[2])
     )
 
 
 async def back_sub_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Go back to sub-markets."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    event = context.user_data.get('selected_event')
-    event_idx = context.user_data.get('selected_event_index', 0)
+    event = state.selected_event
+    event_idx = state.selected_event_index
     
     if not event:
         await back_events_callback(update, context)
         return
     
-    text = (
-        f"📊 <b>{event.title}</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"<b>Betting Options:</b>"
-    )
+    text = _BACK_SUB_TMPL.format(title=event.title)
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=sub_markets_keyboard(event.markets, event_idx)
@@ -487,13 +910,14 @@ async def back_sub_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def outcome_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle outcome selection (Yes/No) - show amount options."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    outcome_key = query.data.split('_')[1].upper()  # out_yes -> YES
+    outcome_key = context.matches[0].group(1).upper()  # out_yes -> YES
     
-    sub = context.user_data.get('selected_sub_market')
+    sub = state.selected_sub_market
     if not sub:
-        await query.edit_message_text("⚠️ Market not found. Start over with /buy")
+        await edit_message(query, "⚠️ Market not found. Start over with /buy")
         return
     
     # Get actual outcome labels
@@ -511,49 +935,53 @@ async def outcome_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         outcome_label = oe_no  # e.g., "Pakistan" or "No"
     
     if not token_id:
-        await query.edit_message_text("⚠️ Token data unavailable for this market. Try another market.")
+        await edit_message(query, "⚠️ Token data unavailable for this market. Try another market.")
         return
     
-    # Refresh price from CLOB for accuracy (Gamma prices can be stale)
-    try:
-        client = get_polymarket_client()
-        live_price = await client.get_price(token_id)
-        if live_price > 0 and live_price != 0.5:
-            price = live_price
-    except Exception:
-        pass  # Keep Gamma price as fallback
+    # Refresh price from CLOB for accuracy (Gamma prices can be stale);
+    # usually already fetched while the user was reading the details view
+    live_price = await _live_price(update.effective_user.id, context.bot_data['client'], token_id)
+    if live_price > 0 and live_price != 0.5:
+        price = live_price
     
-    context.user_data['selected_token_id'] = token_id
-    context.user_data['selected_outcome'] = outcome_label  # Store actual label
-    context.user_data['selected_price'] = price
+    state.selected_token_id = token_id
+    state.selected_outcome = outcome_label  # Store actual label
+    state.selected_price = price
     
-    event = context.user_data.get('selected_event')
+    event = state.selected_event
     event_title = event.title if event else sub.question
+    state.market_info = _market_info(sub, event, outcome_label)
     
-    text = (
-        f"💵 <b>Enter Amount</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 {event_title}\n"
-        f"🎯 <b>{sub.group_item_title or sub.question}</b>\n"
-        f"📍 Buying: {outcome_label} @ ${price:.2f}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"<b>Select amount (USD):</b>"
+    text = _AMOUNT_TMPL.format(
+        event_title=event_title, sub_title=sub.group_item_title or sub.question,
+        outcome=outcome_label, price=_price_strs(price)[1]
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=amount_keyboard()
     )
 
 
+def _market_info(sub, event, outcome: str) -> Dict[str, str]:
+    """market_info dict passed to buy_market for the selected outcome."""
+    return {
+        'condition_id': sub.condition_id if sub else '',
+        'question': event.title if event else (sub.question if sub else 'Unknown'),
+        'outcome': outcome,
+    }
+
+
 async def back_out_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Go back to outcome selection."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    sub = context.user_data.get('selected_sub_market')
-    event = context.user_data.get('selected_event')
+    sub = state.selected_sub_market
+    event = state.selected_event
     
     if not sub:
         await buy_command(update, context)
@@ -561,34 +989,13 @@ async def back_out_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     oe_yes = getattr(sub, 'outcome_yes', 'Yes')
     oe_no = getattr(sub, 'outcome_no', 'No')
-    yes_prob = sub.yes_price * 100
-    no_prob = sub.no_price * 100
     
     event_title = event.title if event else sub.question
+    price_text = _price_lines(oe_yes, oe_no, sub.yes_price, sub.no_price, with_dollars=False)
+    text = _render_market_details(event_title, sub.group_item_title or sub.question, price_text)
     
-    if oe_yes != 'Yes' and oe_no != 'No':
-        price_text = (
-            f"   🔵 {oe_yes}: {yes_prob:.0f}¢\n"
-            f"   🔴 {oe_no}: {no_prob:.0f}¢"
-        )
-    else:
-        price_text = (
-            f"   ✅ YES: {yes_prob:.0f}¢\n"
-            f"   ❌ NO: {no_prob:.0f}¢"
-        )
-    
-    text = (
-        f"📊 <b>Market Details</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 <b>{event_title}</b>\n"
-        f"🎯 <b>{sub.group_item_title or sub.question}</b>\n\n"
-        f"💹 <b>Prices:</b>\n"
-        f"{price_text}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"<b>Select your position:</b>"
-    )
-    
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=outcome_keyboard(outcome_yes=oe_yes, outcome_no=oe_no)
@@ -598,44 +1005,46 @@ async def back_out_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle amount selection - show confirmation."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
     
-    amount_str = query.data.split('_')[1]  # amt_10 -> 10
+    amount_key = context.matches[0].group(1)  # amt_p3 -> p3, amt_custom -> custom
     
-    if amount_str == 'custom':  # custom
-        await query.edit_message_text(
-            f"✏️ <b>Custom Amount</b>\n\nEnter amount in USD (min ${Config.MIN_TRADE_USD:.0f}, max ${Config.MAX_TRADE_USD:.0f}):",
+    if amount_key == 'custom':  # custom
+        await edit_message(
+            query,
+            _CUSTOM_AMOUNT_TMPL.format(min=_MIN_USD, max=_MAX_USD),
             parse_mode='HTML'
         )
         return CUSTOM_AMOUNT
     
-    amount = float(amount_str)
+    try:
+        amount = AMOUNT_PRESETS[int(amount_key[1:])]
+    except (IndexError, ValueError):
+        await edit_message(query, "⚠️ Unknown amount. Pick again or use ✏️ Custom.")
+        return
     return await show_buy_confirmation(query, context, amount)
 
 
 async def show_buy_confirmation(query, context, amount: float):
     """Show buy confirmation screen."""
-    sub = context.user_data.get('selected_sub_market')
-    event = context.user_data.get('selected_event')
-    outcome = context.user_data.get('selected_outcome', 'YES')
-    price = context.user_data.get('selected_price', 0.5)
+    state = get_flow_state(context)
+    sub = state.selected_sub_market
+    event = state.selected_event
+    outcome = state.selected_outcome
+    price = state.selected_price
     
     if not sub:
-        await query.edit_message_text("⚠️ Market not found. Start over with /buy")
+        await edit_message(query, "⚠️ Market not found. Start over with /buy")
         return
     
-    est_shares = amount / price if price > 0 else 0
-    
-    context.user_data['buy_amount'] = amount
+    state.buy_amount = amount
     
-    mode_text = "📝 PAPER" if Config.is_paper_mode() else "💱 LIVE"
     event_title = event.title if event else sub.question
     
     # Fetch USDC balance (cached, fast)
     balance_line = ""
     try:
-        from core.polymarket_client import get_polymarket_client
-        client = get_polymarket_client()
+        client = context.bot_data['client']
         bal = await client.get_balance()
         remaining = bal - amount
         balance_line = f"💵 Balance   ${bal:.2f} → ${remaining:.2f}\n"
@@ -645,56 +1054,55 @@ async def show_buy_confirmation(query, context, amount: float):
     # Fee estimate
     fee_line = ""
     try:
-        from core.position_manager import calc_fee
         fee_rate = calc_fee(price)
         fee_usd = amount * fee_rate
         fee_line = f"💸 Fee       ~${fee_usd:.2f} ({fee_rate*100:.2f}%)\n"
     except Exception:
         pass
     
-    text = (
-        f"⚡ <b>Confirm Buy</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 <b>{event_title}</b>\n"
-        f"🎯 <b>{sub.group_item_title or sub.question}</b>\n\n"
-        f"Outcome   {outcome}\n"
-        f"Price     ${price:.4f}\n"
-        f"Amount    ${amount:.2f}\n"
-        f"Shares    ~{est_shares:.2f}\n"
-        f"{fee_line}"
-        f"{balance_line}"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"Mode: {mode_text}\n\n"
-        f"<i>🔥 Market order = instant execution</i>"
+    text = _render_confirm(
+        event_title, sub.group_item_title or sub.question, outcome, price, amount,
+        fee_line, balance_line, footer=_CONFIRM_FOOTER
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=buy_confirm_keyboard()
     )
 
 
+async def _safe_add(**position):
+    """Register a filled buy with the position manager; never raises."""
+    try:
+        pm = get_position_manager()
+        await pm.add_position(**position)
+    except Exception as e:
+        print(f"⚠️ Position tracking add failed: {e}")
+
+
 async def execute_buy_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Execute the buy order."""
     query = update.callback_query
-    await query.answer("⚡ Executing buy...")
+    answer_later(query, "⚡ Executing buy...")
+    state = get_flow_state(context)
     
-    token_id = context.user_data.get('selected_token_id')
-    amount = context.user_data.get('buy_amount')
-    sub = context.user_data.get('selected_sub_market')
-    event = context.user_data.get('selected_event')
-    outcome = context.user_data.get('selected_outcome', 'YES')
+    token_id = state.selected_token_id
+    amount = state.buy_amount
+    sub = state.selected_sub_market
+    event = state.selected_event
+    outcome = state.selected_outcome
     
     if not token_id or not amount:
-        await query.edit_message_text("⚠️ Session expired. Use /buy to start over.")
+        await edit_message(query, "⚠️ Session expired. Use /buy to start over.")
         return
     
-    market_info = {
-        'condition_id': sub.condition_id if sub else '',
-        'question': event.title if event else (sub.question if sub else 'Unknown'),
-        'outcome': outcome
-    }
+    # Only outcome_callback builds market_info; a custom amount can recover the
+    # token from the sub-market without it, leaving it unset or stale
+    market_info = state.market_info
+    if market_info is None or market_info['condition_id'] != (sub.condition_id if sub else ''):
+        market_info = state.market_info = _market_info(sub, event, outcome)
     
     client = await require_auth(update)
     if not client:
@@ -702,6 +1110,7 @@ async def execute_buy_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     result = await client.buy_market(token_id, amount, market_info=market_info)
     
     if result.success:
+        invalidate_balance(update.effective_user.id)
         event_title = event.title if event else (sub.question if sub else 'Position')
         sub_title = sub.group_item_title or sub.question if sub else ''
         
@@ -713,60 +1122,35 @@ async def execute_buy_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         # Calculate fee estimate
         fee_usd = 0.0
         try:
-            from core.position_manager import calc_fee
             fee_rate = calc_fee(price)
             fee_usd = cost * fee_rate
         except Exception:
             pass
         
-        # Add to position manager for live tracking
-        try:
-            from core.position_manager import get_position_manager
-            pm = get_position_manager()
-            await pm.add_position(
-                token_id=token_id,
-                condition_id=sub.condition_id if sub else '',
-                question=event_title,
-                outcome=outcome,
-                size=filled,
-                avg_price=price,
-                current_price=price,
-            )
-        except Exception:
-            pass
+        # Add to position manager for live tracking (in the background —
+        # the confirmation below doesn't depend on it)
+        spawn(_safe_add(
+            token_id=token_id,
+            condition_id=sub.condition_id if sub else '',
+            question=event_title,
+            outcome=outcome,
+            size=filled,
+            avg_price=price,
+            current_price=price,
+        ))
         
-        text = (
-            f"✅ <b>Buy Executed!</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"📋 {event_title}\n"
-            f"🎯 {sub_title}\n"
-            f"📍 {outcome}\n\n"
-            f"📦 {filled:.2f} shares @ {price*100:.1f}¢\n"
-            f"💵 Cost     ${cost:.2f}\n"
-        )
-        if fee_usd > 0:
-            text += f"💸 Fee      ~${fee_usd:.2f}\n"
-            text += f"💰 Total    ~${cost + fee_usd:.2f}\n"
+        fee_lines = _BUY_FEE_LINES_TMPL.format(fee=fee_usd, total=cost + fee_usd) if fee_usd > 0 else ""
         order_tag = f"🆔 <code>{result.order_id[:16]}...</code>\n" if result.order_id else ""
-        text += (
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"{order_tag}"
-            f"<i>{'📝 Paper trade' if Config.is_paper_mode() else '💱 Live trade'}</i>\n\n"
-            f"/positions → view live P&L"
+        text = _BUY_DONE_TMPL.format(
+            event_title=event_title, sub_title=sub_title, outcome=outcome,
+            filled=filled, cents=price * 100, cost=cost, fee_lines=fee_lines,
+            order_tag=order_tag, mode='📝 Paper trade' if _PAPER_MODE else '💱 Live trade'
         )
     else:
         error_msg = result.error or 'Unknown error'
         # Detect geo-block for user-friendly message
-        from core.polymarket_client import is_geo_block_error
         if is_geo_block_error(error_msg):
-            text = (
-                "🚫 <b>Trading Blocked (Geo-Restriction)</b>\n\n"
-                "Polymarket restricts trading from certain regions.\n"
-                "Your server IP is in a blocked region.\n\n"
-                "🌍 <b>Blocked:</b> US, Cuba, Iran, North Korea, Syria, "
-                "Russia, Belarus, Myanmar, Venezuela, Zimbabwe, France\n\n"
-                "💡 Deploy on a server in an allowed region."
-            )
+            text = _GEO_BLOCK_TEXT
         elif 'invalid signature' in error_msg.lower():
             # Show per-user sig_type (from /connect session), NOT the env var
             per_user_sig = '?'
@@ -779,26 +1163,12 @@ async def execute_buy_callback(update: Update, context: ContextTypes.DEFAULT_TYP
                     per_user_funder = getattr(bld, 'funder', '?') if bld else '?'
             except Exception:
                 pass
-            sig_label = {0: 'EOA', 1: 'Proxy/Magic', 2: 'GnosisSafe'}.get(per_user_sig, str(per_user_sig))
-            text = (
-                "❌ <b>Invalid Signature</b>\n\n"
-                "The order was rejected because the signature doesn't match.\n\n"
-                f"<b>Your session config:</b>\n"
-                f"• sig_type: {per_user_sig} ({sig_label})\n"
-                f"• funder: <code>{str(per_user_funder)[:16]}...</code>\n\n"
-                "<b>Fix:</b>\n"
-                "• /disconnect → /connect again with correct wallet type\n"
-                "• Email/browser login → provide funder address (sig_type=1)\n"
-                "• MetaMask/EOA → skip funder (sig_type=0)\n\n"
-                "Use /debug_wallet for full config info."
+            sig_label = _SIG_LABELS.get(per_user_sig, str(per_user_sig))
+            text = _BAD_SIG_TMPL.format(
+                sig=per_user_sig, label=sig_label, funder=str(per_user_funder)[:16]
             )
         else:
-            text = (
-                f"❌ <b>Buy Failed</b>\n"
-                f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-                f"Error: {error_msg}\n\n"
-                f"Please try again."
-            )
+            text = _BUY_FAILED_TMPL.format(error=error_msg)
     
     # After buy: show action buttons
     if result.success:
@@ -817,17 +1187,24 @@ async def execute_buy_callback(update: Update, context: ContextTypes.DEFAULT_TYP
             ]
         ])
     
-    await query.edit_message_text(text, parse_mode='HTML', reply_markup=keyboard)
+    await edit_message(query, text, parse_mode='HTML', reply_markup=keyboard)
+
+
 async def market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle market selection from search results."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
+    state = get_flow_state(context)
     
-    idx = int(query.data.split('_')[1])  # mkt_0 -> 0
-    markets = context.user_data.get('markets', [])
+    idx = int(context.matches[0].group(1))  # mkt_0 -> 0
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
+    markets = nav.markets
     
     if idx >= len(markets):
-        await query.edit_message_text("⚠️ Market not found. Try again with /buy")
+        await edit_message(query, "⚠️ Market not found. Try again with /buy")
         return
     
     market = markets[idx]
@@ -837,7 +1214,6 @@ async def market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     oe_no = getattr(market, 'outcome_no', 'No')
     
     # Convert to sub-market for compatibility
-    from core.polymarket_client import SubMarket
     sub = SubMarket(
         condition_id=market.condition_id,
         question=market.question,
@@ -850,36 +1226,19 @@ async def market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         outcome_no=oe_no
     )
     
-    context.user_data['selected_sub_market'] = sub
-    context.user_data['selected_market'] = market
-    context.user_data['selected_event'] = None  # No parent event
-    
-    yes_prob = market.yes_price * 100
-    no_prob = market.no_price * 100
+    state.selected_sub_market = sub
+    state.selected_market = market
+    state.selected_event = None  # No parent event
+    _prefetch_prices(update.effective_user.id, context.bot_data['client'], sub)
     
-    if oe_yes != 'Yes' and oe_no != 'No':
-        price_text = (
-            f"   🔵 {oe_yes}: {yes_prob:.0f}¢ (${market.yes_price:.2f})\n"
-            f"   🔴 {oe_no}: {no_prob:.0f}¢ (${market.no_price:.2f})"
-        )
-    else:
-        price_text = (
-            f"   ✅ YES: {yes_prob:.0f}¢ (${market.yes_price:.2f})\n"
-            f"   ❌ NO: {no_prob:.0f}¢ (${market.no_price:.2f})"
-        )
-    
-    text = (
-        f"📊 <b>Market Details</b>\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📋 <b>{market.question}</b>\n\n"
-        f"💹 <b>Prices:</b>\n"
-        f"{price_text}\n\n"
-        f"📈 Volume: ${market.volume:,.0f}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"<b>Select your position:</b>"
+    price_text = _price_lines(oe_yes, oe_no, market.yes_price, market.no_price)
+    text = _render_market_details(
+        market.question, '', price_text,
+        extra=f"\n📈 Volume: ${market.volume:,.0f}\n"
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
         reply_markup=outcome_keyboard(outcome_yes=oe_yes, outcome_no=oe_no)
@@ -889,38 +1248,45 @@ async def market_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle legacy pagination."""
     query = update.callback_query
-    await query.answer()
+    answer_later(query)
     
-    page = int(query.data.split('_')[1])
-    markets = context.user_data.get('markets', [])
+    page = int(context.matches[0].group(1))  # pg_1 -> 1
+    nav = get_nav(update, create=False)
+    if nav is None:
+        await edit_message(query, _SESSION_EXPIRED)
+        return
+    markets = nav.markets
     
-    text = f"📊 <b>Markets</b>\n\nPage {page + 1}:"
+    text = _markets_page_header(nav.markets_title, len(markets), page + 1)
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text,
         parse_mode='HTML',
+        disable_web_page_preview=True,
         reply_markup=markets_keyboard(markets, page=page)
     )
 
 
 async def custom_amount_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle custom amount input."""
+    state = get_flow_state(context)
     try:
         amount = float(update.message.text.strip().replace('$', ''))
         
-        if amount < Config.MIN_TRADE_USD:
-            await update.message.reply_text(f"⚠️ Minimum amount is ${Config.MIN_TRADE_USD}")
+        if amount < _MIN_USD:
+            await reply_message(update.message, f"⚠️ Minimum amount is ${_MIN_USD}")
             return CUSTOM_AMOUNT
         
-        if amount > Config.MAX_TRADE_USD:
-            await update.message.reply_text(f"⚠️ Maximum amount is ${Config.MAX_TRADE_USD}")
+        if amount > _MAX_USD:
+            await reply_message(update.message, f"⚠️ Maximum amount is ${_MAX_USD}")
             return CUSTOM_AMOUNT
         
-        token_id = context.user_data.get('selected_token_id')
-        sub = context.user_data.get('selected_sub_market')
-        event = context.user_data.get('selected_event')
-        outcome = context.user_data.get('selected_outcome', 'YES')
-        price = context.user_data.get('selected_price', 0.5)
+        token_id = state.selected_token_id
+        sub = state.selected_sub_market
+        event = state.selected_event
+        outcome = state.selected_outcome
+        price = state.selected_price
         
         if not token_id:
             # Try to recover from sub-market data
@@ -930,25 +1296,21 @@ async def custom_amount_input(update: Update, context: ContextTypes.DEFAULT_TYPE
                 else:
                     token_id = getattr(sub, 'no_token_id', None)
                 if token_id:
-                    context.user_data['selected_token_id'] = token_id
+                    state.selected_token_id = token_id
             
             if not token_id:
-                await update.message.reply_text("⚠️ Market data not found. Use /buy to start over.")
-                return ConversationHandler.END
-        
-        est_shares = amount / price if price > 0 else 0
+                await reply_message(update.message, "⚠️ Market data not found. Use /buy to start over.")
+                return CONV_END
         
-        context.user_data['buy_amount'] = amount
+        state.buy_amount = amount
         
-        mode_text = "📝 PAPER" if Config.is_paper_mode() else "💱 LIVE"
         event_title = event.title if event else (sub.question if sub else 'Unknown')
         sub_title = sub.group_item_title or sub.question if sub else ''
         
         # Fetch USDC balance
         balance_line = ""
         try:
-            from core.polymarket_client import get_polymarket_client
-            client = get_polymarket_client()
+            client = context.bot_data['client']
             bal = await client.get_balance()
             remaining = bal - amount
             balance_line = f"💵 Balance   ${bal:.2f} → ${remaining:.2f}\n"
@@ -958,36 +1320,25 @@ async def custom_amount_input(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Fee estimate
         fee_line = ""
         try:
-            from core.position_manager import calc_fee
             fee_rate = calc_fee(price)
             fee_usd = amount * fee_rate
             fee_line = f"💸 Fee       ~${fee_usd:.2f} ({fee_rate*100:.2f}%)\n"
         except Exception:
             pass
         
-        text = (
-            f"⚡ <b>Confirm Buy</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"📋 <b>{event_title}</b>\n"
-            f"🎯 <b>{sub_title}</b>\n\n"
-            f"Outcome   {outcome}\n"
-            f"Price     ${price:.4f}\n"
-            f"Amount    ${amount:.2f}\n"
-            f"Shares    ~{est_shares:.2f}\n"
-            f"{fee_line}"
-            f"{balance_line}"
-            f"━━━━━━━━━━━━━━━━━━━━━\n"
-            f"Mode: {mode_text}"
+        text = _render_confirm(
+            event_title, sub_title, outcome, price, amount, fee_line, balance_line
         )
         
-        await update.message.reply_text(
+        await reply_message(
+            update.message,
             text,
             parse_mode='HTML',
             reply_markup=buy_confirm_keyboard()
         )
         
-        return ConversationHandler.END
+        return CONV_END
         
     except ValueError:
-        await update.message.reply_text("⚠️ Please enter a valid number")
+        await reply_message(update.message, "⚠️ Please enter a valid number")
         return CUSTOM_AMOUNT
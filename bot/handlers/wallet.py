@@ -4,16 +4,161 @@ Wallet Handlers
 Handles /balance and /wallet commands.
 """
 
+import asyncio
+import io
+import json
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from config import Config
-from core.polymarket_client import get_polymarket_client, require_auth
+from core.cache import TTLCache
+from core.polymarket_client import require_auth, wallet_snapshot
+from core.user_manager import get_user_manager
 from bot.keyboards.inline import main_menu_keyboard
+from bot.messaging import answer_later, reply_message, reply_or_edit, spawn
+
+try:
+    from py_clob_client.clob_types import (
+        AssetType, BalanceAllowanceParams, MarketOrderArgs, OrderArgs, RequestArgs
+    )
+    from py_clob_client.headers.headers import create_level_2_headers
+    from py_clob_client.order_builder.constants import BUY
+except ImportError:  # Paper-only installs: /test_sign needs a live ClobClient anyway
+    pass
+
+
+# Env SIGNATURE_TYPE → label for /debug_wallet
+_SIG_LABELS = {0: "EOA (direct wallet)", 1: "Poly Proxy", 2: "GnosisSafe (proxy wallet)"}
+
+# Telegram HTML only needs &, < and > escaped in text; one translate pass
+_HTML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_HEX_CHARS = frozenset("0123456789abcdefABCDEFx")
+
+
+def esc(text: str) -> str:
+    """HTML-escape text for a Telegram message (addresses/hex pass through)."""
+    if _HEX_CHARS.issuperset(text):
+        return text
+    return text.translate(_HTML_ESCAPES)
+
+
+# Upper bound for each /test_sign step, so one stalled relay/RPC call
+# can't hold the command (and its worker thread's caller) forever
+_STEP_TIMEOUT = 15
+
+# Any recently active token will do for a signing smoke test
+_active_token_cache = TTLCache(maxsize=1, ttl=60)
+# Concurrent /test_sign runs on a cold cache share one Gamma fetch
+_active_token_lock = asyncio.Lock()
+
+# user_id -> (balance, position_value, total_pnl, active_count), so repeated
+# /balance taps within the TTL don't refetch; dropped whenever funds move
+_balance_cache = TTLCache(maxsize=1024, ttl=Config.BALANCE_CACHE_TTL)
+
+
+def invalidate_balance(user_id: int):
+    """Forget a user's cached /balance summary (call after orders/cancels)."""
+    _balance_cache.pop(user_id)
+
+
+# Keep-alive client for /test_sign's Gamma, relay and RPC calls
+_http: Optional[httpx.AsyncClient] = None
+
+
+def _get_http() -> httpx.AsyncClient:
+    """Shared HTTP client (connections and TLS sessions reused across calls)."""
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(
+            timeout=10,
+            # /test_sign is low-volume: keep a few warm connections per host
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=50),
+        )
+    return _http
+
+
+async def close_http():
+    """Close the shared HTTP client (on shutdown)."""
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MESSAGE TEMPLATES (built once at import, filled with str.format)
+# ═══════════════════════════════════════════════════════════════════
+_WALLET_TMPL = (
+    "💰 <b>Wallet</b>  |  {mode}\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "💵 USDC        ${balance:.2f}\n"
+    "📊 Positions   ${position_value:.2f}\n"
+    "━━━━━━━━━━━━━━━━━━━━━\n"
+    "📈 Total       ${total_value:.2f}\n\n"
+    "{pnl_emoji} P&L  ${total_pnl:+.2f} ({pnl_percent:+.1f}%)\n"
+    "📊 {active_count} active positions\n"
+    "━━━━━━━━━━━━━━━━━━━━━"
+)
+
+_TEST_SIGN_HEAD_TMPL = (
+    "🔧 <b>Signature Test</b>\n\n"
+    "<b>sig_type:</b> {sig_type} (0=EOA, 1=Proxy, 2=GnosisSafe)\n"
+    "<b>signer:</b> <code>{signer}</code>\n"
+    "<b>funder:</b> <code>{funder}</code>\n"
+    "<b>same?:</b> {same}\n\n"
+)
+
+_DEBUG_HEAD_TMPL = """
+🔧 <b>Wallet Debug Info</b>
+
+<b>Trading Mode:</b> {mode}
+
+<b>Signer (EOA):</b> <code>{signer}</code>
+<b>Funder (Proxy):</b> <code>{actual_funder}</code>
+<b>Private Key:</b> <code>{pk_display}</code>
+
+<b>Env SIGNATURE_TYPE:</b> {sig_type} ({sig_label})
+<b>Chain ID:</b> {chain_id}
+
+"""
+
+_DEBUG_SESSION_TMPL = """<b>Per-User Session (used for trades!):</b>
+  sig_type: <b>{sig}</b> (0=EOA, 1=PolyProxy, 2=GnosisSafe)
+  funder: <code>{funder}</code>
+  signer: <code>{signer}</code>
+
+"""
+
+_DEBUG_NO_SESSION = "<b>Per-User Session:</b> none — /connect a wallet to trade\n\n"
+
+# Env-only, so rendered once into _config_snapshot()['footer']
+_DEBUG_FOOT_TMPL = """<b>CLOB URL:</b> {clob_url}
+<b>Relay:</b> {relay}
+<b>Relay Auth:</b> {relay_auth}
+
+━━━━━━━━━━━━━━━━━━━
+<b>Troubleshooting "invalid signature":</b>
+
+• Polymarket browser accounts use <b>sig_type=2</b> (GnosisSafe)
+  → FUNDER_ADDRESS must be your <b>proxy wallet</b> address
+  (Find it on polygonscan: the contract that holds your USDC)
+
+• If you use a <b>direct EOA wallet</b> (MetaMask export):
+  → sig_type should be <b>0</b>
+  → FUNDER_ADDRESS can be empty
+
+• sig_type=1 (PolyProxy) requires on-chain operator approval
+  → NOT recommended unless you've set that up
+
+• To fix: /disconnect → /connect again with correct settings
+• The env var SIGNATURE_TYPE is for the global client (browse only)
+• Your per-user sig_type (from /connect) is what matters for trades
+"""
 
 
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -22,171 +167,261 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not client:
         return
     
-    balance = await client.get_balance()
-    positions = await client.get_positions()
-    
-    # Filter out settled/resolved positions (same logic as /positions)
-    active_positions = [
-        p for p in positions
-        if not (p.current_price <= 0.02 or p.current_price >= 0.98
-                or p.pnl_percent <= -95 or p.pnl_percent >= 95)
-    ]
+    user_id = update.effective_user.id
+    summary = _balance_cache.get(user_id)
+    if summary is None:
+        # Independent lookups — run them concurrently; a failure in either
+        # should end in a message, not a silently dropped update
+        try:
+            balance, positions = await asyncio.gather(
+                client.get_balance(),
+                client.get_positions()
+            )
+        except Exception as e:
+            print(f"⚠️ Balance fetch failed: {e}")
+            await reply_or_edit(
+                update,
+                "⚠️ Couldn't load your wallet right now. Try /balance again.",
+                reply_markup=main_menu_keyboard()
+            )
+            return
+    
+        # One pass: skip settled/resolved positions (same logic as /positions)
+        # and accumulate value, P&L and count together
+        position_value = 0.0
+        total_pnl = 0.0
+        active_count = 0
+        for p in positions or ():
+            price = p.current_price
+            pct = p.pnl_percent
+            if not (0.02 < price < 0.98 and -95 < pct < 95):
+                continue
+            position_value += p.value
+            total_pnl += p.pnl
+            active_count += 1
+    
+        summary = (balance, position_value, total_pnl, active_count)
+        _balance_cache[user_id] = summary
+    balance, position_value, total_pnl, active_count = summary
     
-    position_value = sum(p.value for p in active_positions)
     total_value = balance + position_value
-    total_pnl = sum(p.pnl for p in active_positions)
     
     pnl_emoji = "🟢" if total_pnl >= 0 else "🔴"
-    pnl_percent = (total_pnl / (total_value - total_pnl) * 100) if (total_value - total_pnl) > 0 else 0
-    
-    mode_text = "📝 Paper" if Config.is_paper_mode() else "💱 Live"
-    
-    text = (
-        f"💰 <b>Wallet</b>  |  {mode_text}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"💵 USDC        ${balance:.2f}\n"
-        f"📊 Positions   ${position_value:.2f}\n"
-        f"━━━━━━━━━━━━━━━━━━━━━\n"
-        f"📈 Total       ${total_value:.2f}\n\n"
-        f"{pnl_emoji} P&L  ${total_pnl:+.2f} ({pnl_percent:+.1f}%)\n"
-        f"📊 {len(active_positions)} active positions\n"
-        f"━━━━━━━━━━━━━━━━━━━━━"
+    if active_count:
+        cost_basis = total_value - total_pnl
+        pnl_percent = (total_pnl / cost_basis * 100) if cost_basis > 0 else 0.0
+    else:
+        pnl_percent = 0.0  # New or fully settled account — nothing to weigh
+    
+    mode_text = "📝 Paper" if Config.PAPER_MODE else "💱 Live"
+    
+    text = _WALLET_TMPL.format(
+        mode=mode_text, balance=balance, position_value=position_value,
+        total_value=total_value, pnl_emoji=pnl_emoji, total_pnl=total_pnl,
+        pnl_percent=pnl_percent, active_count=active_count,
     )
     
-    if update.callback_query:
-        await update.callback_query.edit_message_text(
-            text,
-            parse_mode='HTML',
-            reply_markup=main_menu_keyboard()
-        )
-    else:
-        await update.message.reply_text(
-            text,
-            parse_mode='HTML',
-            reply_markup=main_menu_keyboard()
-        )
+    await reply_or_edit(update, text, parse_mode='HTML', reply_markup=main_menu_keyboard())
 
 
 async def balance_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle balance button callback."""
-    await update.callback_query.answer()
+    # Ack in the background so it overlaps the balance/positions fetch
+    answer_later(update.callback_query)
     await balance_command(update, context)
 
 
-async def debug_wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /debug_wallet command - show wallet config for debugging signature issues."""
-    from core.polymarket_client import get_polymarket_client
-    
-    client = get_polymarket_client()
-    
-    # Mask private key
+def _attrs(obj) -> dict:
+    """Instance-attribute snapshot of obj ({} for None / slotted objects)."""
+    try:
+        return vars(obj) if obj is not None else {}
+    except TypeError:
+        return {}
+
+
+@lru_cache(maxsize=1)
+def _config_snapshot() -> dict:
+    """Env-derived /debug_wallet fields — Config is fixed after startup."""
     pk = Config.POLYGON_PRIVATE_KEY
-    pk_display = f"{pk[:6]}...{pk[-4:]}" if len(pk) > 10 else "(not set)"
-    
-    # Funder address
     funder = Config.FUNDER_ADDRESS
-    funder_display = funder if funder else "NOT SET ⚠️"
-    
-    # Signature type
     sig_type = Config.SIGNATURE_TYPE
-    sig_label = {0: "EOA (direct wallet)", 1: "Poly Proxy", 2: "GnosisSafe (proxy wallet)"}.get(sig_type, f"Unknown ({sig_type})")
+    snap = {
+        'mode': "PAPER 📝" if Config.PAPER_MODE else "LIVE 💱",
+        'pk_display': f"{pk[:6]}...{pk[-4:]}" if len(pk) > 10 else "(not set)",  # masked
+        'funder_display': funder if funder else "NOT SET ⚠️",
+        'sig_type': sig_type,
+        'sig_label': _SIG_LABELS.get(sig_type, f"Unknown ({sig_type})"),
+        'chain_id': Config.POLYGON_CHAIN_ID,
+        'clob_url': Config.get_clob_url(),
+        'relay': Config.CLOB_RELAY_URL or "NOT SET (direct)",
+        'relay_auth': "SET" if Config.CLOB_RELAY_AUTH_TOKEN else "NOT SET",
+    }
+    snap['footer'] = _DEBUG_FOOT_TMPL.format(**snap)
+    return snap
+
+
+async def debug_wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /debug_wallet command - show wallet config for debugging signature issues."""
+    client = context.bot_data['client']
+    cfg = _config_snapshot()
     
     # Signer (EOA) address from ClobClient
     signer = "(unknown)"
     actual_funder = "(unknown)"
-    actual_sig_type = sig_type
     if client and client.clob_client:
-        try:
-            signer = client.clob_client.get_address()
-        except Exception:
-            pass
-        actual_funder = getattr(client, '_funder_address', funder_display)
-        # Get actual sig_type from the ClobClient (may differ from env var)
-        actual_sig_type = getattr(client.clob_client, 'sig_type',
-                         getattr(client.clob_client, 'signature_type', sig_type))
-    
-    # Also check per-user session sig_type
-    per_user_sig = "(no session)"
-    per_user_funder = "(no session)"
-    per_user_signer = "(no session)"
+        signer = client.snapshot().signer or signer
+        actual_funder = _attrs(client).get('_funder_address', cfg['funder_display'])
+    
+    parts = [_DEBUG_HEAD_TMPL.format(signer=signer, actual_funder=actual_funder, **cfg)]
+    
+    # Per-user session block (what trades actually sign with) — only when there is one
+    session = None
     try:
-        from core.user_manager import get_user_manager
-        um = get_user_manager()
-        user_id = update.effective_user.id
-        session = um.get_session(user_id)
-        if session:
-            per_user_sig = session.signature_type
-            per_user_funder = session.funder_address or "(empty)"
-            # Get from the session's ClobClient.builder (actual runtime value)
-            if session.clob_client:
-                builder = getattr(session.clob_client, 'builder', None)
-                if builder:
-                    per_user_sig = getattr(builder, 'sig_type', per_user_sig)
-                    per_user_funder = getattr(builder, 'funder', per_user_funder)
-                try:
-                    per_user_signer = session.clob_client.get_address()
-                except Exception:
-                    pass
+        session = get_user_manager().get_session(update.effective_user.id)
     except Exception:
         pass
+    if session:
+        per_user_sig = session.signature_type
+        per_user_funder = session.funder_address or "(empty)"
+        per_user_signer = "(unknown)"
+        # Get from the session's ClobClient.builder (actual runtime value)
+        if session.clob_client:
+            snap = wallet_snapshot(session.clob_client)
+            if snap.sig_type is not None:
+                per_user_sig = snap.sig_type
+            if snap.funder is not None:
+                per_user_funder = snap.funder
+            per_user_signer = snap.signer or per_user_signer
+        parts.append(_DEBUG_SESSION_TMPL.format(
+            sig=per_user_sig, funder=per_user_funder, signer=per_user_signer
+        ))
+    else:
+        parts.append(_DEBUG_NO_SESSION)
     
-    # Relay config
-    relay = Config.CLOB_RELAY_URL or "NOT SET (direct)"
-    relay_auth = "SET" if Config.CLOB_RELAY_AUTH_TOKEN else "NOT SET"
-    
-    # Trading mode
-    mode = "PAPER 📝" if Config.is_paper_mode() else "LIVE 💱"
+    parts.append(cfg['footer'])
+    text = "".join(parts)
     
-    text = f"""
-🔧 <b>Wallet Debug Info</b>
+    await reply_or_edit(update, text, parse_mode='HTML')
 
-<b>Trading Mode:</b> {mode}
 
-<b>Signer (EOA):</b> <code>{signer}</code>
-<b>Funder (Proxy):</b> <code>{actual_funder}</code>
-<b>Private Key:</b> <code>{pk_display}</code>
+async def _cancel_test_order(cc, order_id: str):
+    """Cancel the order /test_sign just posted; never raises."""
+    try:
+        await asyncio.wait_for(asyncio.to_thread(cc.cancel, order_id), _STEP_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ /test_sign cancel failed for {order_id}: {e!r}")
 
-<b>Env SIGNATURE_TYPE:</b> {sig_type} ({sig_label})
-<b>Chain ID:</b> {Config.POLYGON_CHAIN_ID}
 
-<b>Per-User Session (used for trades!):</b>
-  sig_type: <b>{per_user_sig}</b> (0=EOA, 1=PolyProxy, 2=GnosisSafe)
-  funder: <code>{per_user_funder}</code>
-  signer: <code>{per_user_signer}</code>
+# On-chain probe targets (Polygon mainnet) and 4-byte call selectors
+_RPC_URL = "https://polygon-bor-rpc.publicnode.com"
+_USDCE = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"  # USDC.e
+_EXCHANGES = (
+    ("CTF", "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E"),
+    ("NegRisk", "0xC5d563A36AE78145C45a50134d48A1215220f80a"),
+)
+_BAL_OF = "0x70a08231"    # balanceOf(address)
+_IS_APPR = "0xe985e9c5"   # isApprovedForAll(address,address)
 
-<b>CLOB URL:</b> {Config.get_clob_url()}
-<b>Relay:</b> {relay}
-<b>Relay Auth:</b> {relay_auth}
 
-━━━━━━━━━━━━━━━━━━━
-<b>Troubleshooting "invalid signature":</b>
+def _pad_addr(addr: str) -> str:
+    """0x-address as a 32-byte ABI word (no 0x prefix)."""
+    return addr[2:].lower().zfill(64)
 
-• Polymarket browser accounts use <b>sig_type=2</b> (GnosisSafe)
-  → FUNDER_ADDRESS must be your <b>proxy wallet</b> address
-  (Find it on polygonscan: the contract that holds your USDC)
 
-• If you use a <b>direct EOA wallet</b> (MetaMask export):
-  → sig_type should be <b>0</b>
-  → FUNDER_ADDRESS can be empty
+def _u256(result) -> int:
+    """Decode a one-word eth_call result; "0x" (no code at address) reads as 0."""
+    return int(result, 16) if result and result != "0x" else 0
 
-• sig_type=1 (PolyProxy) requires on-chain operator approval
-  → NOT recommended unless you've set that up
 
-• To fix: /disconnect → /connect again with correct settings
-• The env var SIGNATURE_TYPE is for the global client (browse only)
-• Your per-user sig_type (from /connect) is what matters for trades
-"""
+async def _onchain_probe(signer_addr: str, funder: str, sig_type) -> str:
+    """USDC.e balances and exchange approvals for /test_sign, as report lines."""
+    buf = io.StringIO()
+    w = buf.write
+    # Each address is padded once and reused across every call it appears in
+    signer_word = _pad_addr(signer_addr) if signer_addr.startswith('0x') else None
+    funder_word = _pad_addr(funder) if funder.startswith('0x') else None
+    
+    # Collect every eth_call first so they go out as one JSON-RPC batch
+    calls = []  # (kind, label, to, data)
+    for label, word in (("EOA", signer_word), ("Funder", funder_word)):
+        if word:
+            calls.append(("bal", label, _USDCE, _BAL_OF + word))
+    
+    # Operator approval on exchange contracts (only for proxy sig types)
+    if str(sig_type) not in ('0', '?') and signer_word and funder_word:
+        call_data = _IS_APPR + funder_word + signer_word  # (owner, operator)
+        for ex_name, ex_addr in _EXCHANGES:
+            calls.append(("appr", ex_name, ex_addr, call_data))
+    
+    if calls:
+        batch = [
+            {"jsonrpc": "2.0", "method": "eth_call",
+             "params": [{"to": to, "data": data}, "latest"], "id": i}
+            for i, (_, _, to, data) in enumerate(calls)
+        ]
+        try:
+            hc = _get_http()
+            rpc_resp = await hc.post(_RPC_URL, json=batch)
+            body = rpc_resp.json()
+            if not isinstance(body, list):  # node rejected the whole batch
+                body = [body]
+            by_id = {r.get("id"): r for r in body if isinstance(r, dict)}
+            batch_error = None
+        except Exception as e:
+            by_id, batch_error = {}, str(e)
     
-    if update.callback_query:
-        await update.callback_query.edit_message_text(text, parse_mode='HTML')
-    else:
-        await update.message.reply_text(text, parse_mode='HTML')
+        for i, (kind, label, _, _) in enumerate(calls):
+            try:
+                if batch_error is not None:
+                    raise RuntimeError(batch_error)
+                entry = by_id.get(i)
+                if entry is None:
+                    raise RuntimeError("no response")
+                if "error" in entry:
+                    raise RuntimeError(entry["error"].get("message", "rpc error"))
+                value = _u256(entry.get("result"))
+                if kind == "bal":
+                    balance_usd = value / 1e6
+                    emoji = "💰" if balance_usd > 0.01 else "⚠️"
+                    w(f"   {emoji} {label} USDC.e: ${balance_usd:.2f}\n")
+                else:
+                    st = "✅ Approved" if value != 0 else "❌ NOT approved"
+                    w(f"   {label}: signer→funder {st}\n")
+            except Exception as e:
+                what = f"{label} balance" if kind == "bal" else label
+                w(f"   ⚠️ {what}: {esc(str(e)[:50])}\n")
+    return buf.getvalue()
+
+
+async def _clob_allowance(cc, sig_type) -> str:
+    """CLOB collateral balance/allowance for /test_sign, as a report line."""
+    buf = io.StringIO()
+    w = buf.write
+    try:
+        ba_params = BalanceAllowanceParams(
+            asset_type=AssetType.COLLATERAL,
+            signature_type=int(sig_type) if str(sig_type).isdigit() else 0,
+        )
+        ba_resp = await asyncio.wait_for(
+            asyncio.to_thread(cc.get_balance_allowance, ba_params), _STEP_TIMEOUT
+        )
+        if isinstance(ba_resp, dict):
+            allowance = float(ba_resp.get('allowance', 0))
+            if allowance > 1_000_000:
+                allowance /= 1e6
+            clob_bal = float(ba_resp.get('balance', 0))
+            if clob_bal > 1_000_000:
+                clob_bal /= 1e6
+            w(f"   CLOB balance: ${clob_bal:.2f}, allowance: ${allowance:.2f}\n")
+    except asyncio.TimeoutError:
+        w(f"   ⚠️ CLOB allowance: timed out after {_STEP_TIMEOUT}s\n")
+    except Exception as e:
+        w(f"   ⚠️ CLOB allowance: {esc(str(e)[:60])}\n")
+    return buf.getvalue()
 
 
 async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /test_sign - test order signing to diagnose 'invalid signature' errors."""
-    from html import escape as esc
-    from core.polymarket_client import require_auth
     
     client = await require_auth(update)
     if not client:
@@ -194,67 +429,114 @@ async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     cc = client.clob_client
     if not cc:
-        await update.message.reply_text("❌ No ClobClient available.")
+        await reply_message(update.message, "❌ No ClobClient available.")
         return
     
-    builder = getattr(cc, 'builder', None)
-    sig_type = getattr(builder, 'sig_type', '?') if builder else '?'
-    funder = getattr(builder, 'funder', '?') if builder else '?'
-    
-    try:
-        signer_addr = cc.get_address()
-    except Exception:
-        signer_addr = '?'
+    snap = client.snapshot()
+    sig_type = '?' if snap.sig_type is None else snap.sig_type
+    # Stringified once: used in the header, the checks and the RPC payloads
+    funder = '?' if snap.funder is None else str(snap.funder)
+    signer_addr = str(snap.signer) if snap.signer else '?'
     
     post_status = None  # Track POST result for diagnostics
     
-    lines = [
-        f"🔧 <b>Signature Test</b>\n",
-        f"<b>sig_type:</b> {sig_type} (0=EOA, 1=Proxy, 2=GnosisSafe)",
-        f"<b>signer:</b> <code>{esc(str(signer_addr))}</code>",
-        f"<b>funder:</b> <code>{esc(str(funder))}</code>",
-        f"<b>same?:</b> {'YES ⚠️' if str(signer_addr).lower() == str(funder).lower() else 'NO ✅ (expected for proxy)'}",
-        "",
-    ]
+    # Report is built up section by section and flushed to the chat at each
+    # boundary, so results show up while the slower steps are still running
+    buf = io.StringIO()
+    w = buf.write
+    
+    async def _flush():
+        text = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        # Sections are well under Telegram's 4096 limit; split on a line
+        # boundary anyway in case a relay echoes back something huge
+        while len(text) > 4000:
+            cut = text.rfind('\n', 0, 4000) + 1 or 4000
+            await reply_message(update.message, text[:cut], parse_mode='HTML')
+            text = text[cut:]
+        if text.strip():
+            await reply_message(update.message, text, parse_mode='HTML')
+    
+    w(_TEST_SIGN_HEAD_TMPL.format(
+        sig_type=sig_type, signer=esc(signer_addr), funder=esc(funder),
+        same='YES ⚠️' if signer_addr.lower() == funder.lower() else 'NO ✅ (expected for proxy)',
+    ))
+    
+    # py-clob calls below are blocking (HTTP + ECDSA signing) — run them in a
+    # worker thread so other chats aren't stalled while the test runs, and
+    # bound every step with _STEP_TIMEOUT
     
     # Test 1: Create API creds
-    try:
-        creds = cc.create_or_derive_api_creds()
-        cc.set_api_creds(creds)
-        lines.append("✅ API creds: OK")
-    except Exception as e:
-        lines.append(f"❌ API creds: {esc(str(e))}")
+    async def _api_creds() -> str:
+        try:
+            creds = await asyncio.wait_for(
+                asyncio.to_thread(cc.create_or_derive_api_creds), _STEP_TIMEOUT
+            )
+            cc.set_api_creds(creds)
+            return "✅ API creds: OK\n"
+        except asyncio.TimeoutError:
+            return f"❌ API creds: timed out after {_STEP_TIMEOUT}s\n"
+        except Exception as e:
+            return f"❌ API creds: {esc(str(e))}\n"
     
     # Test 2: Fetch a real active market token to use for signing test
-    test_token = None
-    try:
-        import httpx
-        async with httpx.AsyncClient(timeout=10) as hc:
-            resp = await hc.get(
-                "https://gamma-api.polymarket.com/markets",
-                params={"closed": "false", "limit": "1", "active": "true"},
-            )
-            mkts = resp.json()
-            if mkts and isinstance(mkts, list):
-                test_token = mkts[0].get("clobTokenIds")
-                if test_token:
-                    # clobTokenIds is a JSON string like '["tok1","tok2"]'
-                    import json
-                    tokens = json.loads(test_token) if isinstance(test_token, str) else test_token
-                    test_token = tokens[0] if tokens else None
-                if not test_token:
-                    test_token = mkts[0].get("tokens", [{}])[0].get("token_id")
-                lines.append(f"✅ Found active market token: ...{str(test_token)[-8:]}")
-            else:
-                lines.append("❌ No active markets found on Gamma API")
-    except Exception as e:
-        lines.append(f"❌ Fetch active market: {esc(str(e))}")
+    async def _active_token():
+        test_token = _active_token_cache.get('token')
+        if test_token:
+            return test_token, f"✅ Active market token (cached): ...{str(test_token)[-8:]}\n"
+        async with _active_token_lock:
+            # Another run may have filled the cache while we waited
+            test_token = _active_token_cache.get('token')
+            if test_token:
+                return test_token, f"✅ Active market token (cached): ...{str(test_token)[-8:]}\n"
+            try:
+                hc = _get_http()
+                resp = await hc.get(
+                    "https://gamma-api.polymarket.com/markets",
+                    params={"closed": "false", "limit": "1", "active": "true"},
+                )
+                mkts = resp.json()
+                if mkts and isinstance(mkts, list):
+                    # Prefer the structured tokens list; clobTokenIds is a JSON
+                    # string like '["tok1","tok2"]' and needs a second parse
+                    tokens = mkts[0].get("tokens")
+                    if tokens and isinstance(tokens, list):
+                        test_token = tokens[0].get("token_id")
+                    if not test_token:
+                        raw = mkts[0].get("clobTokenIds")
+                        ids = json.loads(raw) if isinstance(raw, str) else raw
+                        test_token = ids[0] if ids else None
+                    if test_token:
+                        _active_token_cache['token'] = test_token
+                    return test_token, f"✅ Found active market token: ...{str(test_token)[-8:]}\n"
+                return None, "❌ No active markets found on Gamma API\n"
+            except Exception as e:
+                return None, f"❌ Fetch active market: {esc(str(e))}\n"
+    
+    # The on-chain probe needs only the addresses — start it now and let it
+    # overlap with everything below; its lines are written at the end
+    onchain_task = asyncio.create_task(_onchain_probe(signer_addr, funder, sig_type))
+    
+    # Creds and token don't depend on each other — run them side by side
+    creds_line, (test_token, token_line) = await asyncio.gather(_api_creds(), _active_token())
+    w(creds_line)
+    w(token_line)
+    
+    # The allowance lookup needs L2 creds but not the token — overlap it
+    # with the sign/POST chain
+    allowance_task = asyncio.create_task(_clob_allowance(cc, sig_type))
     
     # Helper to safely stringify EIP712 struct fields (may be objects, not strings)
     def _s(val):
         """Convert EIP712 struct field to plain string, HTML-escaped."""
         if val is None:
             return '?'
+        # Plain values (the common case) need no probing
+        if isinstance(val, str):
+            return esc(val) if val else '?'
+        if isinstance(val, int):
+            return str(val)
         # EIP712 types store value in .value or ._value or .__str__
         for attr in ('value', '_value'):
             if hasattr(val, attr):
@@ -270,53 +552,38 @@ async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return esc(repr(val))
         return esc(s)
     
-    # Test 3: Try signing a GTC limit order with the real token
-    signed = None
+    # Test 3: Sign a GTC limit order and a FAK market order (what buy_market
+    # uses). Both only need the token, so sign them side by side
+    signed = fak_signed = None
     if test_token:
-        try:
-            from py_clob_client.clob_types import OrderArgs, MarketOrderArgs, OrderType
-            from py_clob_client.order_builder.constants import BUY
-            
-            order_args = OrderArgs(
-                token_id=test_token,
-                price=0.01,
-                size=5.0,
-                side=BUY
-            )
-            signed = cc.create_order(order_args)
-            lines.append(f"✅ GTC sign: OK")
-            
-            if hasattr(signed, 'order'):
-                o = signed.order
-                lines.append(f"   maker: <code>{_s(getattr(o, 'maker', '?'))}</code>")
-                lines.append(f"   signer: <code>{_s(getattr(o, 'signer', '?'))}</code>")
-                lines.append(f"   sigType: {_s(getattr(o, 'signatureType', getattr(o, 'sigType', '?')))}")
-        except Exception as e:
-            lines.append(f"❌ GTC sign: {esc(str(e))}")
+        order_args = OrderArgs(token_id=test_token, price=0.01, size=5.0, side=BUY)
+        mkt_args = MarketOrderArgs(token_id=test_token, amount=1.0, side=BUY)
+        gtc_res, fak_res = await asyncio.gather(
+            asyncio.wait_for(asyncio.to_thread(cc.create_order, order_args), _STEP_TIMEOUT),
+            asyncio.wait_for(asyncio.to_thread(cc.create_market_order, mkt_args), _STEP_TIMEOUT),
+            return_exceptions=True,
+        )
+        for label, res, fields in (("GTC", gtc_res, ('maker', 'signer')), ("FAK", fak_res, ('maker',))):
+            if isinstance(res, asyncio.TimeoutError):
+                w(f"❌ {label} sign: timed out after {_STEP_TIMEOUT}s\n")
+                continue
+            if isinstance(res, BaseException):
+                w(f"❌ {label} sign: {esc(str(res))}\n")
+                continue
+            w(f"✅ {label} sign: OK\n")
+            o = getattr(res, 'order', None)
+            if o is not None:
+                for name in fields:
+                    w(f"   {name}: <code>{_s(getattr(o, name, '?'))}</code>\n")
+                w(f"   sigType: {_s(getattr(o, 'signatureType', getattr(o, 'sigType', '?')))}\n")
+        if not isinstance(gtc_res, BaseException):
+            signed = gtc_res
+        if not isinstance(fak_res, BaseException):
+            fak_signed = fak_res
     else:
-        lines.append("⏭️ Skipping sign test (no token)")
+        w("⏭️ Skipping sign test (no token)\n")
     
-    # Test 3b: Try signing a FAK market order (this is what buy_market uses)
-    fak_signed = None
-    if test_token:
-        try:
-            from py_clob_client.clob_types import MarketOrderArgs, OrderType
-            from py_clob_client.order_builder.constants import BUY
-            
-            mkt_args = MarketOrderArgs(
-                token_id=test_token,
-                amount=1.0,
-                side=BUY
-            )
-            fak_signed = cc.create_market_order(mkt_args)
-            lines.append(f"✅ FAK sign: OK")
-            
-            if hasattr(fak_signed, 'order'):
-                o = fak_signed.order
-                lines.append(f"   maker: <code>{_s(getattr(o, 'maker', '?'))}</code>")
-                lines.append(f"   sigType: {_s(getattr(o, 'signatureType', getattr(o, 'sigType', '?')))}")
-        except Exception as e:
-            lines.append(f"❌ FAK sign: {esc(str(e))}")
+    await _flush()
     
     # Test 4: Post order via RAW httpx (bypass py-clob post_order to get full response)
     post_target = fak_signed or signed
@@ -324,10 +591,6 @@ async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     post_label = "FAK" if fak_signed else "GTC"
     if post_target:
         try:
-            import json as _json
-            from py_clob_client.headers.headers import create_level_2_headers
-            from py_clob_client.clob_types import RequestArgs
-            
             # Build exact same body as post_order
             body = {
                 "order": post_target.dict(),
@@ -335,17 +598,17 @@ async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "orderType": post_type,
                 "postOnly": False,
             }
-            serialized = _json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+            serialized = json.dumps(body, separators=(",", ":"), ensure_ascii=False)
             
             # Show key order fields
             od = body["order"]
-            lines.append(f"\n<b>Order payload:</b>")
-            lines.append(f"   maker: <code>{esc(str(od.get('maker','')))[:20]}...</code>")
-            lines.append(f"   signer: <code>{esc(str(od.get('signer','')))[:20]}...</code>")
-            lines.append(f"   sigType: {od.get('signatureType', '?')}")
-            lines.append(f"   side: {od.get('side', '?')}")
-            lines.append(f"   tokenId: ...{esc(str(od.get('tokenId','')))[-8:]}")
-            lines.append(f"   sig: <code>{esc(str(od.get('signature','')))[:20]}...</code>")
+            w(f"\n<b>Order payload:</b>\n")
+            w(f"   maker: <code>{esc(str(od.get('maker','')))[:20]}...</code>\n")
+            w(f"   signer: <code>{esc(str(od.get('signer','')))[:20]}...</code>\n")
+            w(f"   sigType: {od.get('signatureType', '?')}\n")
+            w(f"   side: {od.get('side', '?')}\n")
+            w(f"   tokenId: ...{esc(str(od.get('tokenId','')))[-8:]}\n")
+            w(f"   sig: <code>{esc(str(od.get('signature','')))[:20]}...</code>\n")
             
             # Build L2 auth headers
             req_args = RequestArgs(
@@ -358,132 +621,63 @@ async def test_sign_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             headers["Content-Type"] = "application/json"
             headers["User-Agent"] = "py_clob_client"
             
-            lines.append(f"\n<b>Auth headers:</b>")
-            lines.append(f"   POLY_ADDRESS: <code>{esc(headers.get('POLY_ADDRESS','')[:16])}...</code>")
-            lines.append(f"   POLY_API_KEY: <code>{esc(headers.get('POLY_API_KEY','')[:12])}...</code>")
+            w(f"\n<b>Auth headers:</b>\n")
+            w(f"   POLY_ADDRESS: <code>{esc(headers.get('POLY_ADDRESS','')[:16])}...</code>\n")
+            w(f"   POLY_API_KEY: <code>{esc(headers.get('POLY_API_KEY','')[:12])}...</code>\n")
             
             # Post via raw httpx to relay
-            import httpx
             relay_url = cc.host + "/order"
-            async with httpx.AsyncClient(timeout=15) as hc:
-                raw_resp = await hc.post(relay_url, content=serialized.encode(), headers=headers)
+            hc = _get_http()
+            raw_resp = await asyncio.wait_for(
+                hc.post(relay_url, content=serialized.encode(), headers=headers, timeout=15),
+                _STEP_TIMEOUT,
+            )
             post_status = raw_resp.status_code
             
-            lines.append(f"\n<b>POST {post_label} → {esc(cc.host[:30])}:</b>")
-            lines.append(f"   status: {raw_resp.status_code}")
+            w(f"\n<b>POST {post_label} → {esc(cc.host[:30])}:</b>\n")
+            w(f"   status: {raw_resp.status_code}\n")
             resp_text = raw_resp.text[:200]
-            lines.append(f"   body: <code>{esc(resp_text)}</code>")
+            w(f"   body: <code>{esc(resp_text)}</code>\n")
             
             if raw_resp.status_code == 200:
                 try:
                     rj = raw_resp.json()
                     if rj.get('success'):
-                        lines.append(f"✅ Post {post_label}: SUCCESS 🎉")
+                        w(f"✅ Post {post_label}: SUCCESS 🎉\n")
                         oid = rj.get('orderID', '')
                         if oid:
-                            try:
-                                cc.cancel(oid)
-                                lines.append(f"   (cancelled)")
-                            except Exception:
-                                lines.append(f"   ⚠️ Cancel failed. ID: {oid}")
+                            # Cancel off the reply path; failures are logged
+                            spawn(_cancel_test_order(cc, oid))
+                            w(f"   (cancelling in background — ID: <code>{esc(str(oid))}</code>)\n")
                 except Exception:
                     pass
                     
+        except asyncio.TimeoutError:
+            w(f"❌ Post {post_label}: no response after {_STEP_TIMEOUT}s\n")
         except Exception as e:
-            lines.append(f"❌ Post {post_label}: {esc(str(e)[:200])}")
+            w(f"❌ Post {post_label}: {esc(str(e)[:200])}\n")
     else:
-        lines.append("⏭️ Skipping post test (signing failed)")
-    
-    # ═══ On-chain diagnostics ═══
-    import httpx  # Ensure available outside POST try block
-    lines.append(f"\n<b>═══ On-chain Checks ═══</b>")
-    rpc_url = "https://polygon-bor-rpc.publicnode.com"
-    usdc_contract = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"  # USDC.e
-    
-    # Check USDC balance on both addresses
-    for label, addr in [("EOA", str(signer_addr)), ("Funder", str(funder))]:
-        if not addr or addr == '?' or not addr.startswith('0x'):
-            continue
-        try:
-            padded = addr[2:].lower().zfill(64)
-            call_data = f"0x70a08231{padded}"  # balanceOf(address)
-            async with httpx.AsyncClient(timeout=10) as hc:
-                rpc_resp = await hc.post(rpc_url, json={
-                    "jsonrpc": "2.0", "method": "eth_call",
-                    "params": [{"to": usdc_contract, "data": call_data}, "latest"],
-                    "id": 1,
-                })
-                result = rpc_resp.json().get("result", "0x0")
-                balance_wei = int(result, 16)
-                balance_usd = balance_wei / 1e6
-                emoji = "💰" if balance_usd > 0.01 else "⚠️"
-                lines.append(f"   {emoji} {label} USDC.e: ${balance_usd:.2f}")
-        except Exception as e:
-            lines.append(f"   ⚠️ {label} balance: {esc(str(e)[:50])}")
+        w("⏭️ Skipping post test (signing failed)\n")
     
-    # Check operator approval on exchange contracts (only for proxy sig types)
-    if str(sig_type) not in ('0', '?') and str(signer_addr).startswith('0x') and str(funder).startswith('0x'):
-        exchanges = [
-            ("CTF", "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E"),
-            ("NegRisk", "0xC5d563A36AE78145C45a50134d48A1215220f80a"),
-        ]
-        owner_padded = str(funder)[2:].lower().zfill(64)
-        operator_padded = str(signer_addr)[2:].lower().zfill(64)
-        # isApprovedForAll(address,address) selector
-        call_data = f"0xe985e9c5{owner_padded}{operator_padded}"
-        for ex_name, ex_addr in exchanges:
-            try:
-                async with httpx.AsyncClient(timeout=10) as hc:
-                    rpc_resp = await hc.post(rpc_url, json={
-                        "jsonrpc": "2.0", "method": "eth_call",
-                        "params": [{"to": ex_addr, "data": call_data}, "latest"],
-                        "id": 1,
-                    })
-                    result = rpc_resp.json().get("result", "0x0")
-                    approved = int(result, 16) != 0
-                    st = "✅ Approved" if approved else "❌ NOT approved"
-                    lines.append(f"   {ex_name}: signer→funder {st}")
-            except Exception as e:
-                lines.append(f"   ⚠️ {ex_name}: {esc(str(e)[:50])}")
+    await _flush()
     
-    # Check CLOB allowance
-    try:
-        from py_clob_client.clob_types import BalanceAllowanceParams, AssetType
-        ba_params = BalanceAllowanceParams(
-            asset_type=AssetType.COLLATERAL,
-            signature_type=int(sig_type) if str(sig_type).isdigit() else 0,
-        )
-        ba_resp = cc.get_balance_allowance(ba_params)
-        if isinstance(ba_resp, dict):
-            allowance = float(ba_resp.get('allowance', 0))
-            if allowance > 1_000_000:
-                allowance /= 1e6
-            clob_bal = float(ba_resp.get('balance', 0))
-            if clob_bal > 1_000_000:
-                clob_bal /= 1e6
-            lines.append(f"   CLOB balance: ${clob_bal:.2f}, allowance: ${allowance:.2f}")
-    except Exception as e:
-        lines.append(f"   ⚠️ CLOB allowance: {esc(str(e)[:60])}")
+    # ═══ On-chain diagnostics ═══
+    w(f"\n<b>═══ On-chain Checks ═══</b>\n")
+    w(await onchain_task)
+    w(await allowance_task)
     
     # Actionable summary
-    lines.append("")
+    w("\n")
     if post_status == 400:
-        lines.append("<b>⚠️ Fixing 'invalid signature':</b>")
-        lines.append("1️⃣ Try <b>sig_type=0</b> (EOA mode):")
-        lines.append("   /disconnect → /connect")
-        lines.append("   Leave funder empty, pick EOA")
-        lines.append("2️⃣ Ensure USDC is on your EOA address")
-        lines.append("3️⃣ If using proxy wallet:")
-        lines.append("   Operator approval must exist on-chain")
-    else:
-        lines.append("<b>If issues persist:</b>")
-        lines.append("→ /disconnect → /connect with correct settings")
-    
-    # Send (split if too long for Telegram's 4096 limit)
-    full_text = '\n'.join(lines)
-    if len(full_text) > 4000:
-        mid = len(lines) // 2
-        await update.message.reply_text('\n'.join(lines[:mid]), parse_mode='HTML')
-        await update.message.reply_text('\n'.join(lines[mid:]), parse_mode='HTML')
+        w("<b>⚠️ Fixing 'invalid signature':</b>\n")
+        w("1️⃣ Try <b>sig_type=0</b> (EOA mode):\n")
+        w("   /disconnect → /connect\n")
+        w("   Leave funder empty, pick EOA\n")
+        w("2️⃣ Ensure USDC is on your EOA address\n")
+        w("3️⃣ If using proxy wallet:\n")
+        w("   Operator approval must exist on-chain\n")
     else:
-        await update.message.reply_text(full_text, parse_mode='HTML')
+        w("<b>If issues persist:</b>\n")
+        w("→ /disconnect → /connect with correct settings\n")
+    
+    await _flush()
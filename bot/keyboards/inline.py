@@ -6,13 +6,18 @@ Supports events with sub-markets for sports betting.
 Shows event timing status (🔴 LIVE / 🟢 Upcoming) and date info.
 """
 
+import time
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from typing import List, Any
+from typing import List, Any, Optional
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 
 
+@lru_cache(maxsize=1)
 def main_menu_keyboard() -> InlineKeyboardMarkup:
-    """Main dashboard buttons — Trojan/BonkBot style."""
+    """Main dashboard buttons — Trojan/BonkBot style (static, built once)."""
     return InlineKeyboardMarkup([
         [
             InlineKeyboardButton("📊 Positions", callback_data="positions"),
@@ -37,54 +42,54 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def positions_keyboard(positions: List[Any]) -> InlineKeyboardMarkup:
-    """List of positions with instant sell buttons — sniper style."""
-    buttons = []
-    
-    for idx, pos in enumerate(positions[:10]):
-        pnl_emoji = "🟢" if pos.pnl >= 0 else "🔴"
-        pnl_str = f"+${pos.pnl:.2f}" if pos.pnl >= 0 else f"-${abs(pos.pnl):.2f}"
-        # Compact: market name + PnL on one button, instant sell next to it
-        label = f"{pnl_emoji} {pos.market_question[:22]}.. {pnl_str}"
-        buttons.append([
-            InlineKeyboardButton(label, callback_data=f"pos_{idx}"),
-            InlineKeyboardButton("⚡ Sell", callback_data=f"isell_{idx}_100")
-        ])
-    
-    buttons.append([
+def _trunc(text: str, limit: int) -> str:
+    """text cut to `limit` chars, with an ellipsis only when something was cut."""
+    return text if len(text) <= limit else f"{text[:limit]}…"
+
+
+# Trailing rows shared by every build of their list keyboard — tuples, so
+# no builder can mutate the shared rows
+_POSITIONS_FOOTER = (
+    (
         InlineKeyboardButton("📉 Stop Loss", callback_data="sl_pick"),
         InlineKeyboardButton("📈 Take Profit", callback_data="tp_pick"),
-    ])
-    buttons.append([
+    ),
+    (
         InlineKeyboardButton("🔄 Refresh", callback_data="refresh_positions"),
         InlineKeyboardButton("🏠 Menu", callback_data="menu")
-    ])
-    return InlineKeyboardMarkup(buttons)
+    ),
+)
+_MENU_FOOTER = ((InlineKeyboardButton("🔙 Menu", callback_data="menu"),),)
+_LEAGUES_FOOTER = (
+    # "All Events" skips the league filter
+    (InlineKeyboardButton("📋 All Events (no filter)", callback_data="lg_all"),),
+    (InlineKeyboardButton("🔙 Sports", callback_data="cat_sports"),),
+)
 
 
-def position_detail_keyboard(pos_index: int) -> InlineKeyboardMarkup:
-    """Position detail with sell options — sniper style."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("⚡ 25%", callback_data=f"sell_{pos_index}_25"),
-            InlineKeyboardButton("⚡ 50%", callback_data=f"sell_{pos_index}_50"),
-            InlineKeyboardButton("⚡ 75%", callback_data=f"sell_{pos_index}_75"),
-            InlineKeyboardButton("⚡ 100%", callback_data=f"sell_{pos_index}_100")
-        ],
-        [
-            InlineKeyboardButton("✏️ Custom %", callback_data=f"sell_{pos_index}_c")
-        ],
-        [
-            InlineKeyboardButton("📉 Stop Loss", callback_data=f"sl_{pos_index}"),
-            InlineKeyboardButton("📈 Take Profit", callback_data=f"tp_{pos_index}")
-        ],
-        [
-            InlineKeyboardButton("🔄 Refresh", callback_data=f"pos_{pos_index}"),
-            InlineKeyboardButton("◀️ Back", callback_data="positions")
-        ]
-    ])
+# Indexed by `pnl >= 0`
+_PNL_EMOJI = ("🔴", "🟢")
+_PNL_SIGN = ("-", "+")
+
+
+def _position_row(idx: int, pos: Any) -> list:
+    """Compact: market name + PnL on one button, instant sell next to it."""
+    up = pos.pnl >= 0
+    label = f"{_PNL_EMOJI[up]} {_trunc(pos.market_question, 22)} {_PNL_SIGN[up]}${abs(pos.pnl):.2f}"
+    return [
+        InlineKeyboardButton(label, callback_data=f"pos_{idx}"),
+        InlineKeyboardButton("⚡ Sell", callback_data=f"isell_{idx}_100")
+    ]
+
+
+def positions_keyboard(positions: List[Any]) -> InlineKeyboardMarkup:
+    """List of positions with instant sell buttons — sniper style."""
+    buttons = [_position_row(idx, pos) for idx, pos in enumerate(positions[:10])]
+    return InlineKeyboardMarkup((*buttons, *_POSITIONS_FOOTER))
 
 
+# Positions are listed 10 at a time, so these only ever see a few index values
+@lru_cache(maxsize=128)
 def sell_confirm_keyboard(pos_index: int, percent: int) -> InlineKeyboardMarkup:
     """Sell confirmation — prominent confirm button."""
     return InlineKeyboardMarkup([
@@ -93,6 +98,7 @@ def sell_confirm_keyboard(pos_index: int, percent: int) -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=32)
 def instant_sell_keyboard(pos_index: int) -> InlineKeyboardMarkup:
     """
     Position detail with instant sell buttons — sniper style.
@@ -121,8 +127,9 @@ def instant_sell_keyboard(pos_index: int) -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=1)
 def category_keyboard() -> InlineKeyboardMarkup:
-    """Category selection — sniper style."""
+    """Category selection — sniper style (static, built once)."""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton("🏆 Sports", callback_data="cat_sports")],
         [
@@ -137,8 +144,9 @@ def category_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=1)
 def sports_keyboard() -> InlineKeyboardMarkup:
-    """Sports selection."""
+    """Sports selection (static, built once)."""
     return InlineKeyboardMarkup([
         [
             InlineKeyboardButton("🏏 Cricket", callback_data="sp_cricket"),
@@ -169,89 +177,84 @@ def leagues_keyboard(leagues: List[Any], sport: str = '') -> InlineKeyboardMarku
     League/series selection within a sport.
     E.g., Cricket → IPL, T20 World Cup, BBL, PSL
     """
-    buttons = []
-    
-    for idx, league in enumerate(leagues[:10]):
+    def label(league):
         name = league.name if hasattr(league, 'name') else str(league)
         event_count = league.event_count if hasattr(league, 'event_count') else 0
-        
-        if event_count > 0:
-            label = f"🏆 {name} ({event_count} events)"
-        else:
-            label = f"🏆 {name}"
-        
-        buttons.append([InlineKeyboardButton(label, callback_data=f"lg_{idx}")])
+        return f"🏆 {name} ({event_count} events)" if event_count > 0 else f"🏆 {name}"
     
-    # Add "All Events" option to skip league filter
-    buttons.append([InlineKeyboardButton("📋 All Events (no filter)", callback_data="lg_all")])
-    buttons.append([InlineKeyboardButton("🔙 Sports", callback_data="cat_sports")])
-    return InlineKeyboardMarkup(buttons)
+    buttons = [
+        [InlineKeyboardButton(label(league), callback_data=f"lg_{idx}")]
+        for idx, league in enumerate(leagues[:10])
+    ]
+    return InlineKeyboardMarkup((*buttons, *_LEAGUES_FOOTER))
 
 
+@lru_cache(maxsize=1)
 def search_prompt_keyboard() -> InlineKeyboardMarkup:
-    """Keyboard shown during search input prompt."""
+    """Keyboard shown during search input prompt (static, built once)."""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton("❌ Cancel", callback_data="menu")]
     ])
 
 
-def events_keyboard(events: List[Any], page: int = 0) -> InlineKeyboardMarkup:
+def _event_label(title: str, start_date: Optional[str], end_date: Optional[str],
+                 sub_count: int, st: Optional[str]) -> str:
+    """Event button text: timing badge, truncated title, date hint, sub-market count."""
+    # ── Determine timing badge ──
+    status_badge = ""
+    date_hint = ""
+    if start_date:
+        try:
+            from core.polymarket_client import event_status, parse_event_date
+            if st is None:
+                st = event_status(start_date, end_date)
+            if st == 'live':
+                status_badge = "🔴 "
+            elif st == 'upcoming':
+                status_badge = "🟢 "
+                dt = parse_event_date(start_date)
+                if dt:
+                    now = datetime.utcnow()
+                    diff = (dt.replace(tzinfo=None) - now).days
+                    if diff == 0:
+                        date_hint = " (Today)"
+                    elif diff == 1:
+                        date_hint = " (Tomorrow)"
+                    elif 1 < diff <= 7:
+                        date_hint = f" ({dt.strftime('%a')})"
+                    else:
+                        date_hint = f" ({dt.strftime('%d %b')})"
+        except Exception:
+            pass
+    
+    # Truncate title and show sub-market count
+    title = _trunc(title, 28)
+    
+    if sub_count > 1:
+        return f"{status_badge}📋 {title}{date_hint} ({sub_count})"
+    return f"{status_badge}📋 {title}{date_hint}"
+
+
+@lru_cache(maxsize=256)
+def _events_page(rows: tuple, start: int, page: int, has_next: bool,
+                 minute: int) -> InlineKeyboardMarkup:
     """
-    Events list keyboard (matches/games).
-    Shows events with timing status (🔴 LIVE / 🟢 Upcoming) and date.
+    One page of events_keyboard. `rows` holds each event's label inputs, so
+    flipping back to a page whose events haven't changed reuses its markup;
+    `minute` keys out badges and date hints that drift with the clock.
     """
-    buttons = []
-    per_page = 5
-    start = page * per_page
-    end = start + per_page
-    page_events = events[start:end]
-    
-    for idx, event in enumerate(page_events):
-        real_idx = start + idx
-        sub_count = len(event.markets) if hasattr(event, 'markets') else 0
-        
-        # ── Determine timing badge ──
-        status_badge = ""
-        date_hint = ""
-        if hasattr(event, 'start_date') and event.start_date:
-            try:
-                from core.polymarket_client import event_status, parse_event_date
-                st = event_status(event.start_date, getattr(event, 'end_date', None))
-                if st == 'live':
-                    status_badge = "🔴 "
-                elif st == 'upcoming':
-                    status_badge = "🟢 "
-                    dt = parse_event_date(event.start_date)
-                    if dt:
-                        now = datetime.utcnow()
-                        diff = (dt.replace(tzinfo=None) - now).days
-                        if diff == 0:
-                            date_hint = " (Today)"
-                        elif diff == 1:
-                            date_hint = " (Tomorrow)"
-                        elif 1 < diff <= 7:
-                            date_hint = f" ({dt.strftime('%a')})"
-                        else:
-                            date_hint = f" ({dt.strftime('%d %b')})"
-            except Exception:
-                pass
-        
-        # Truncate title and show sub-market count
-        max_title = 28
-        title = event.title[:max_title] + "..." if len(event.title) > max_title else event.title
-        
-        if sub_count > 1:
-            label = f"{status_badge}📋 {title}{date_hint} ({sub_count})"
-        else:
-            label = f"{status_badge}📋 {title}{date_hint}"
-        
-        buttons.append([InlineKeyboardButton(label, callback_data=f"evt_{real_idx}")])
+    buttons = [
+        [InlineKeyboardButton(_event_label(*row), callback_data=f"evt_{start + idx}")]
+        for idx, row in enumerate(rows)
+    ]
     
-    # Pagination
-    nav_buttons = []
+    # Pagination (row only allocated when there is somewhere to go)
+    nav_buttons = None
     if page > 0:
-        nav_buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"evp_{page - 1}"))
-    if end < len(events):
+        nav_buttons = [InlineKeyboardButton("⬅️ Prev", callback_data=f"evp_{page - 1}")]
+    if has_next:
+        if nav_buttons is None:
+            nav_buttons = []
         nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"evp_{page + 1}"))
     
     if nav_buttons:
@@ -261,60 +264,88 @@ def events_keyboard(events: List[Any], page: int = 0) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+def events_keyboard(events: List[Any], page: int = 0,
+                    statuses: Optional[List[str]] = None) -> InlineKeyboardMarkup:
+    """
+    Events list keyboard (matches/games).
+    Shows events with timing status (🔴 LIVE / 🟢 Upcoming) and date.
+    `statuses` (parallel to events) skips re-deriving each event's status.
+    """
+    per_page = 5
+    start = page * per_page
+    end = start + per_page
+    rows = tuple(
+        (
+            event.title,
+            event.start_date,
+            event.end_date,
+            len(event.markets),
+            statuses[start + idx] if statuses is not None else None,
+        )
+        for idx, event in enumerate(islice(events, start, end))
+    )
+    return _events_page(rows, start, page, end < len(events), int(time.time() // 60))
+
+
+# Sub-market category → button emoji
+_CAT_EMOJI = {
+    'finals': '🏆',
+    'match': '⚔️',
+    'player': '🏅',
+    'series': '📊',
+    'prop': '🎲',
+    'other': '📊',
+}
+
+
 def sub_markets_keyboard(sub_markets: List[Any], event_idx: int) -> InlineKeyboardMarkup:
     """
     Sub-markets within an event.
     Shows options like: Match Winner, Toss Winner, Top Scorer, Over/Under
     Also shows outcome names (e.g., India 65% / Pakistan 35%)
     """
-    buttons = []
+    rows = []  # (text, callback_data) — turned into buttons in one pass below
     
-    # Category emoji map
-    cat_emoji = {
-        'finals': '🏆',
-        'match': '⚔️',
-        'player': '🏅',
-        'series': '📊',
-        'prop': '🎲',
-        'other': '📊',
-    }
+    try:
+        from core.polymarket_client import categorize_sub_market
+    except Exception:
+        categorize_sub_market = None
     
     for idx, sub in enumerate(sub_markets[:10]):  # Max 10 sub-markets
         # Categorize
         try:
-            from core.polymarket_client import categorize_sub_market
             cat = categorize_sub_market(sub.group_item_title)
         except Exception:
             cat = 'other'
-        emoji = cat_emoji.get(cat, '📊')
+        emoji = _CAT_EMOJI.get(cat, '📊')
         
-        # Get a short label
-        if sub.group_item_title:
-            label = sub.group_item_title[:30]
-        else:
-            label = sub.question[:30] if len(sub.question) > 30 else sub.question
+        # Get a short label (slicing is a no-op on short titles)
+        title = sub.group_item_title
+        label = title[:30] if title else _trunc(sub.question, 30)
         
         # Show outcome names and prices for team-based markets
-        oe_yes = getattr(sub, 'outcome_yes', 'Yes')
-        oe_no = getattr(sub, 'outcome_no', 'No')
+        oe_yes = sub.outcome_yes
+        oe_no = sub.outcome_no
         yes_pct = int(sub.yes_price * 100)
         no_pct = int(sub.no_price * 100)
         
+        cb = f"sub_{event_idx}_{idx}"
         if oe_yes != 'Yes' and oe_no != 'No':
             # Team-based market: show both teams with odds
-            label = f"{emoji} {label}"
-            buttons.append([InlineKeyboardButton(label, callback_data=f"sub_{event_idx}_{idx}")])
+            rows.append((f"{emoji} {label}", cb))
             # Add small odds line
-            odds_label = f"   {oe_yes} {yes_pct}% | {oe_no} {no_pct}%"
-            buttons.append([InlineKeyboardButton(odds_label, callback_data=f"sub_{event_idx}_{idx}")])
+            rows.append((f"   {oe_yes} {yes_pct}% | {oe_no} {no_pct}%", cb))
         else:
-            label = f"{emoji} {label} ({yes_pct}%)"
-            buttons.append([InlineKeyboardButton(label, callback_data=f"sub_{event_idx}_{idx}")])
+            rows.append((f"{emoji} {label} ({yes_pct}%)", cb))
     
-    buttons.append([InlineKeyboardButton("🔙 Events", callback_data="back_events")])
-    return InlineKeyboardMarkup(buttons)
+    rows.append(("🔙 Events", "back_events"))
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=cb)] for text, cb in rows
+    ])
 
 
+# Markups are immutable in PTB 20, so one instance per outcome pair can be reused
+@lru_cache(maxsize=256)
 def outcome_keyboard(outcome_yes: str = "Yes", outcome_no: str = "No") -> InlineKeyboardMarkup:
     """Outcome selection — shows team names or Yes/No."""
     yes_emoji = "✅" if outcome_yes == "Yes" else "🟢"
@@ -333,27 +364,27 @@ def outcome_keyboard(outcome_yes: str = "Yes", outcome_no: str = "No") -> Inline
     ])
 
 
+# Preset buy amounts (USD). Buttons carry the index (amt_p0…), not the value.
+AMOUNT_PRESETS = (1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+
+@lru_cache(maxsize=1)
 def amount_keyboard() -> InlineKeyboardMarkup:
-    """Amount selection — sniper style quick amounts."""
+    """Amount selection — sniper style quick amounts (static, built once)."""
+    presets = [
+        InlineKeyboardButton(f"${amt:.0f}", callback_data=f"amt_p{i}")
+        for i, amt in enumerate(AMOUNT_PRESETS)
+    ]
     return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("$1", callback_data="amt_1"),
-            InlineKeyboardButton("$2", callback_data="amt_2"),
-            InlineKeyboardButton("$5", callback_data="amt_5"),
-            InlineKeyboardButton("$10", callback_data="amt_10")
-        ],
-        [
-            InlineKeyboardButton("$25", callback_data="amt_25"),
-            InlineKeyboardButton("$50", callback_data="amt_50"),
-            InlineKeyboardButton("$100", callback_data="amt_100"),
-            InlineKeyboardButton("✏️ Custom", callback_data="amt_custom")
-        ],
+        presets[:4],
+        presets[4:] + [InlineKeyboardButton("✏️ Custom", callback_data="amt_custom")],
         [InlineKeyboardButton("◀️ Back", callback_data="back_out")]
     ])
 
 
+@lru_cache(maxsize=1)
 def buy_confirm_keyboard() -> InlineKeyboardMarkup:
-    """Buy confirmation — prominent execute button."""
+    """Buy confirmation — prominent execute button (static, built once)."""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton("⚡ EXECUTE BUY", callback_data="exec_buy")],
         [InlineKeyboardButton("❌ Cancel", callback_data="buy")]
@@ -362,29 +393,29 @@ def buy_confirm_keyboard() -> InlineKeyboardMarkup:
 
 def favorites_keyboard(favorites: List[Any]) -> InlineKeyboardMarkup:
     """Favorites list."""
-    buttons = []
-    
-    for idx, fav in enumerate(favorites[:8]):
-        label = f"⭐ {fav.label[:35]}..."
-        buttons.append([
-            InlineKeyboardButton(label, callback_data=f"fv_{idx}"),
+    buttons = [
+        [
+            InlineKeyboardButton(f"⭐ {_trunc(fav.label, 35)}", callback_data=f"fv_{idx}"),
             InlineKeyboardButton("🗑️", callback_data=f"fd_{idx}")
-        ])
-    
-    buttons.append([InlineKeyboardButton("🔙 Menu", callback_data="menu")])
-    return InlineKeyboardMarkup(buttons)
+        ]
+        for idx, fav in enumerate(favorites[:8])
+    ]
+    return InlineKeyboardMarkup((*buttons, *_MENU_FOOTER))
+
+
+@lru_cache(maxsize=256)
+def _search_results_page(questions: tuple) -> InlineKeyboardMarkup:
+    """search_results_keyboard body, keyed by the listed questions."""
+    buttons = [
+        [InlineKeyboardButton(f"📊 {_trunc(question, 40)}", callback_data=f"mkt_{idx}")]
+        for idx, question in enumerate(questions)
+    ]
+    return InlineKeyboardMarkup((*buttons, *_MENU_FOOTER))
 
 
 def search_results_keyboard(markets: List[Any]) -> InlineKeyboardMarkup:
     """Search results - single markets (not events)."""
-    buttons = []
-    
-    for idx, market in enumerate(markets[:8]):
-        title = market.question[:40] + "..." if len(market.question) > 40 else market.question
-        buttons.append([InlineKeyboardButton(f"📊 {title}", callback_data=f"mkt_{idx}")])
-    
-    buttons.append([InlineKeyboardButton("🔙 Menu", callback_data="menu")])
-    return InlineKeyboardMarkup(buttons)
+    return _search_results_page(tuple(market.question for market in islice(markets, 8)))
 
 
 # Keep legacy markets_keyboard for backward compatibility
@@ -11,6 +11,7 @@ Features:
 
 import asyncio
 import logging
+import re
 import warnings
 from telegram import Update, BotCommand, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -20,13 +21,10 @@ from telegram.ext import (
     MessageHandler,
     ConversationHandler,
     PicklePersistence,
+    PersistenceInput,
     filters
 )
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 from core.polymarket_client import get_polymarket_client, init_polymarket_client
 from core.favorites_db import get_favorites_db
@@ -49,7 +47,7 @@ from bot.handlers.trading import (
     back_events_callback, back_sub_callback, back_out_callback,
     outcome_callback, amount_callback, market_callback, page_callback,
     execute_buy_callback, custom_amount_input, CUSTOM_AMOUNT,
-    refresh_prices_callback
+    refresh_prices_callback, clear_nav_cache
 )
 from bot.handlers.search import (
     search_command, search_callback, search_text_input, info_command,
@@ -59,7 +57,10 @@ from bot.handlers.favorites import (
     favorites_command, favorites_callback,
     fav_add_callback, fav_view_callback, fav_del_callback
 )
-from bot.handlers.wallet import balance_command, balance_callback, debug_wallet_command, test_sign_command
+from bot.handlers.wallet import (
+    balance_command, balance_callback, debug_wallet_command, test_sign_command,
+    close_http as close_wallet_http,
+)
 from bot.handlers.orders import (
     orders_command, orders_callback, cancel_order_callback,
     cancel_all_callback, order_book_callback
@@ -103,7 +104,7 @@ async def start_command(update: Update, context):
     except Exception:
         pass
     
-    mode = "PAPER 📝" if Config.is_paper_mode() else "LIVE 🔴"
+    mode = "PAPER 📝" if Config.PAPER_MODE else "LIVE 🔴"
     
     # Quick position summary from cache (zero latency — no API call)
     pos_badge = ""
@@ -213,6 +214,43 @@ async def error_handler(update: object, context) -> None:
         )
 
 
+def build_callback_router(exact: dict, prefixed: dict):
+    """
+    One callback-query entry point instead of a regex handler per button.
+    
+    `exact` maps full callback_data to (callback, block). `prefixed` maps the
+    text up to and including the first '_' to (pattern, callback, block);
+    the pattern is still matched so routes stay as strict as before, and its
+    match is exposed as context.matches[0] like a pattern handler would.
+    Non-blocking routes run as application tasks (block=False).
+    """
+    compiled = {
+        prefix: (re.compile(pattern), callback, block)
+        for prefix, (pattern, callback, block) in prefixed.items()
+    }
+    
+    async def route(update: Update, context):
+        data = update.callback_query.data or ''
+        target = exact.get(data)
+        if target is not None:
+            callback, block = target
+        else:
+            target = compiled.get(data[:data.find('_') + 1])
+            if target is None:
+                return
+            pattern, callback, block = target
+            match = pattern.match(data)
+            if match is None:
+                return
+            context.matches = [match]
+        if block:
+            await callback(update, context)
+        else:
+            context.application.create_task(callback(update, context), update=update)
+    
+    return route
+
+
 def main():
     """Start the bot."""
     print("🟢 Bot process starting...", flush=True)
@@ -241,12 +279,26 @@ def main():
             if fsize < 10:
                 os.remove(persistence_path)
                 print(f"🗑️ Removed corrupt pickle ({fsize}B)")
-        persistence = PicklePersistence(filepath=persistence_path)
+        # bot_data holds live objects (the shared client) — don't pickle it
+        persistence = PicklePersistence(
+            filepath=persistence_path,
+            store_data=PersistenceInput(bot_data=False),
+        )
         print(f"💾 Persistence: {persistence_path}")
     except Exception as e:
         print(f"⚠️ Persistence init failed (non-fatal): {e}")
         persistence = None
     
+    # uvloop (Linux/macOS) makes every await and socket op cheaper; must be
+    # installed before PTB creates the event loop. Optional — falls back to
+    # the default asyncio loop when missing (e.g. on Windows)
+    try:
+        import uvloop
+        uvloop.install()
+        print("⚡ Event loop: uvloop")
+    except ImportError:
+        pass
+    
     # Build application
     builder = Application.builder().token(Config.TELEGRAM_BOT_TOKEN)
     if persistence:
@@ -292,7 +344,8 @@ def main():
         
         # 1. Initialize Polymarket client (+ load paper positions)
         t1 = _time.time()
-        await init_polymarket_client()
+        # Handlers read the shared client from bot_data instead of the getter
+        application.bot_data['client'] = await init_polymarket_client()
         print(f"✅ Polymarket client initialized ({_time.time()-t1:.1f}s)")
         
         # 2. Initialize position manager (load positions + start tracking)
@@ -339,6 +392,8 @@ def main():
     
     # Graceful shutdown: disconnect WS and cleanup
     async def post_shutdown(application):
+        clear_nav_cache()
+        await close_wallet_http()
         try:
             from core.ws_client import get_ws_client
             ws = get_ws_client()
@@ -388,7 +443,7 @@ def main():
     # ConversationHandler for custom buy amount
     custom_amount_handler = ConversationHandler(
         entry_points=[
-            CallbackQueryHandler(amount_callback, pattern="^amt_custom$")
+            CallbackQueryHandler(amount_callback, pattern=r"^amt_(custom)$")
         ],
         states={
             CUSTOM_AMOUNT: [
@@ -503,17 +558,6 @@ def main():
     # CALLBACK HANDLERS
     # ═══════════════════════════════════════════════════════════════════
     
-    # Menu navigation
-    app.add_handler(CallbackQueryHandler(menu_callback, pattern="^menu$"))
-    app.add_handler(CallbackQueryHandler(balance_callback, pattern="^balance$"))
-    app.add_handler(CallbackQueryHandler(positions_command, pattern="^positions$"))
-    app.add_handler(CallbackQueryHandler(buy_command, pattern="^buy$"))
-    # Note: search$ is now handled by ConversationHandler above
-    app.add_handler(CallbackQueryHandler(favorites_callback, pattern="^favorites$"))
-    app.add_handler(CallbackQueryHandler(hot_callback, pattern="^hot$"))
-    app.add_handler(CallbackQueryHandler(orders_callback, pattern="^orders$"))
-    app.add_handler(CallbackQueryHandler(alerts_callback, pattern="^alerts$"))
-    
     # Lock session from inline button
     async def lock_session_callback(update: Update, context):
         query = update.callback_query
@@ -539,64 +583,70 @@ def main():
                     [InlineKeyboardButton("🏠 Menu", callback_data="menu")]
                 ])
             )
-    app.add_handler(CallbackQueryHandler(lock_session_callback, pattern="^lock_session$"))
-    
-    # Position handlers (non-custom - custom is handled by ConversationHandler above)
-    app.add_handler(CallbackQueryHandler(position_detail_callback, pattern=r"^pos_\d+$"))
-    app.add_handler(CallbackQueryHandler(sell_callback, pattern=r"^sell_\d+_(?!c$)\w+$"))
-    app.add_handler(CallbackQueryHandler(confirm_sell_callback, pattern=r"^csell_\d+_\d+$"))
-    
-    # Instant sell - ONE CLICK, NO CONFIRMATION
-    app.add_handler(CallbackQueryHandler(instant_sell_callback, pattern=r"^isell_\d+_\d+$"))
-    
-    # Stop loss / Take profit quick set (standalone, outside conversation)
-    app.add_handler(CallbackQueryHandler(sl_pick_callback, pattern=r"^sl_pick$"))
-    app.add_handler(CallbackQueryHandler(tp_pick_callback, pattern=r"^tp_pick$"))
-    app.add_handler(CallbackQueryHandler(sl_set_callback, pattern=r"^slset_\d+_\d+$"))
-    app.add_handler(CallbackQueryHandler(tp_set_callback, pattern=r"^tpset_\d+_\d+$"))
-    
-    # Refresh positions
-    app.add_handler(CallbackQueryHandler(refresh_positions_callback, pattern="^refresh_positions$"))
-    
-    # Trading handlers - EVENT BASED FLOW
-    app.add_handler(CallbackQueryHandler(category_callback, pattern="^cat_"))
-    app.add_handler(CallbackQueryHandler(sport_callback, pattern="^sp_"))
-    
-    # League navigation (Sport → Leagues → Events)
-    app.add_handler(CallbackQueryHandler(league_callback, pattern=r"^lg_"))
-    
-    # Event navigation (Events → Sub-Markets)
-    app.add_handler(CallbackQueryHandler(event_callback, pattern=r"^evt_\d+$"))
-    app.add_handler(CallbackQueryHandler(events_page_callback, pattern=r"^evp_\d+$"))
-    app.add_handler(CallbackQueryHandler(sub_market_callback, pattern=r"^sub_\d+_\d+$"))
-    
-    # Back navigation
-    app.add_handler(CallbackQueryHandler(back_events_callback, pattern="^back_events$"))
-    app.add_handler(CallbackQueryHandler(back_sub_callback, pattern="^back_sub$"))
-    app.add_handler(CallbackQueryHandler(back_out_callback, pattern="^back_out$"))
-    
-    # Trading flow (non-custom amounts - custom is handled by ConversationHandler)
-    app.add_handler(CallbackQueryHandler(outcome_callback, pattern="^out_"))
-    app.add_handler(CallbackQueryHandler(refresh_prices_callback, pattern="^refresh_prices$"))
-    app.add_handler(CallbackQueryHandler(amount_callback, pattern=r"^amt_(?!custom)\w+$"))
-    app.add_handler(CallbackQueryHandler(execute_buy_callback, pattern="^exec_buy$"))
-    
-    # Legacy market handlers (for search results)
-    app.add_handler(CallbackQueryHandler(market_callback, pattern=r"^mkt_\d+$"))
-    app.add_handler(CallbackQueryHandler(page_callback, pattern=r"^pg_\d+$"))
-    
-    # Favorites handlers
-    app.add_handler(CallbackQueryHandler(fav_add_callback, pattern="^fav_add$"))
-    app.add_handler(CallbackQueryHandler(fav_view_callback, pattern=r"^fv_\d+$"))
-    app.add_handler(CallbackQueryHandler(fav_del_callback, pattern=r"^fd_\d+$"))
-    
-    # Orders handlers (cancel_all MUST be before cancel_ to avoid pattern shadowing)
-    app.add_handler(CallbackQueryHandler(order_book_callback, pattern="^orderbook$"))
-    app.add_handler(CallbackQueryHandler(cancel_all_callback, pattern="^cancel_all$"))
-    app.add_handler(CallbackQueryHandler(cancel_order_callback, pattern=r"^cancel_(?!all)"))
-    
-    # Alerts handlers
-    app.add_handler(CallbackQueryHandler(delete_alert_callback, pattern="^del_alert_"))
+    
+    # Every other button goes through one router: exact callback_data first,
+    # then its prefix (text up to the first '_'). Conversation handlers above
+    # are registered first, so they still see their buttons before this does.
+    # block=False routes await Gamma/CLOB round-trips, so they run as tasks
+    # instead of making every other user's update wait behind them.
+    exact_routes = {
+        # Menu navigation (search is handled by its ConversationHandler above)
+        "menu": (menu_callback, True),
+        "balance": (balance_callback, True),
+        "positions": (positions_command, True),
+        "buy": (buy_command, True),
+        "favorites": (favorites_callback, True),
+        "hot": (hot_callback, True),
+        "orders": (orders_callback, True),
+        "alerts": (alerts_callback, True),
+        "lock_session": (lock_session_callback, True),
+        # Stop loss / Take profit quick set (standalone, outside conversation)
+        "sl_pick": (sl_pick_callback, True),
+        "tp_pick": (tp_pick_callback, True),
+        "refresh_positions": (refresh_positions_callback, True),
+        # Back navigation
+        "back_events": (back_events_callback, False),
+        "back_sub": (back_sub_callback, False),
+        "back_out": (back_out_callback, False),
+        # Trading flow
+        "refresh_prices": (refresh_prices_callback, False),
+        "exec_buy": (execute_buy_callback, False),
+        # Favorites / orders
+        "fav_add": (fav_add_callback, True),
+        "orderbook": (order_book_callback, True),
+        "cancel_all": (cancel_all_callback, True),
+    }
+    prefix_routes = {
+        # Positions (custom % is handled by its ConversationHandler above)
+        "pos_": (r"^pos_\d+$", position_detail_callback, True),
+        "sell_": (r"^sell_\d+_(?!c$)\w+$", sell_callback, True),
+        "csell_": (r"^csell_\d+_\d+$", confirm_sell_callback, True),
+        # Instant sell - ONE CLICK, NO CONFIRMATION
+        "isell_": (r"^isell_\d+_\d+$", instant_sell_callback, True),
+        "slset_": (r"^slset_\d+_\d+$", sl_set_callback, True),
+        "tpset_": (r"^tpset_\d+_\d+$", tp_set_callback, True),
+        # Trading - EVENT BASED FLOW (Category → Sport → League → Event → Sub-market)
+        "cat_": (r"^cat_(\w+)$", category_callback, False),
+        "sp_": (r"^sp_(\w+)$", sport_callback, False),
+        "lg_": (r"^lg_(all|\d+)$", league_callback, False),
+        "evt_": (r"^evt_(\d+)$", event_callback, False),
+        "evp_": (r"^evp_(\d+)$", events_page_callback, False),
+        "sub_": (r"^sub_(\d+)_(\d+)$", sub_market_callback, False),
+        "out_": (r"^out_(yes|no)$", outcome_callback, False),
+        # Non-custom amounts (custom is handled by its ConversationHandler)
+        "amt_": (r"^amt_(p\d+)$", amount_callback, False),
+        # Legacy market handlers (for search results)
+        "mkt_": (r"^mkt_(\d+)$", market_callback, False),
+        "pg_": (r"^pg_(\d+)$", page_callback, False),
+        # Favorites
+        "fv_": (r"^fv_\d+$", fav_view_callback, True),
+        "fd_": (r"^fd_\d+$", fav_del_callback, True),
+        # Orders (cancel_all is an exact route, so it never reaches this)
+        "cancel_": (r"^cancel_(\d+)_(\w+)$", cancel_order_callback, True),
+        # Alerts
+        "del_": (r"^del_alert_", delete_alert_callback, True),
+    }
+    app.add_handler(CallbackQueryHandler(build_callback_router(exact_routes, prefix_routes)))
     
     # Error handler
     app.add_error_handler(error_handler)
@@ -0,0 +1,147 @@
+"""
+Outbound Messaging
+
+Shared helpers for talking back to Telegram from handlers:
+- Callback-query acks dispatched in the background (no extra RTT on the hot path)
+- Edits and replies paced by a bot-wide token bucket (Telegram allows ~30 msg/s)
+  plus a per-group bucket (~20 msg/min), retried up to _MAX_RETRIES times on a 429 RetryAfter
+"""
+
+import asyncio
+import time
+
+from telegram.error import RetryAfter
+
+from core.cache import TTLCache
+
+
+class RateLimiter:
+    """Async token bucket: at most `rate` acquisitions per `period` seconds."""
+
+    def __init__(self, rate: int = 30, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available, then take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._updated) * self.rate / self.period
+                self._tokens = min(float(self.rate), self._tokens + refill)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+# Shared by every handler so concurrent users queue instead of hitting 429s.
+# 25/s leaves headroom under Telegram's ~30/s for acks and unpaced sends.
+EDIT_LIMITER = RateLimiter(rate=25, period=1.0)
+
+# Groups get their own 20/min bucket on top of the global one; idle
+# chats' buckets are dropped after 10 minutes
+_GROUP_RATE = 20
+_GROUP_PERIOD = 60.0
+_group_limiters = TTLCache(maxsize=4096, ttl=600, touch_on_get=True)
+
+# How many times a send is retried after Telegram answers 429
+_MAX_RETRIES = 2
+
+# Strong refs for fire-and-forget tasks (asyncio only keeps weak ones)
+_background_tasks = set()
+
+
+def _background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        task.exception()  # nobody awaits it; don't log it as unretrieved
+
+
+def spawn(coro) -> asyncio.Task:
+    """Run coro in the background, holding a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def answer_later(query, text=None, **kwargs) -> asyncio.Task:
+    """
+    Answer a callback query without waiting for Telegram's reply.
+
+    The ack carries no data we need, so it runs in the background while the
+    handler goes on to fetch data and edit the message. Errors are swallowed
+    (e.g. the query expired) — the edit that follows is what the user sees.
+    """
+    async def _answer():
+        try:
+            await query.answer(text, **kwargs)
+        except Exception:
+            pass
+
+    return spawn(_answer())
+
+
+def _chat_limiter(chat_id):
+    """Per-chat bucket for group chats (negative ids); None for private chats."""
+    if chat_id is None or chat_id >= 0:
+        return None
+    limiter = _group_limiters.get(chat_id)
+    if limiter is None:
+        limiter = RateLimiter(rate=_GROUP_RATE, period=_GROUP_PERIOD)
+        _group_limiters[chat_id] = limiter
+    return limiter
+
+
+async def _send(chat_id, send):
+    """
+    Run send() under the chat and bot-wide buckets.
+    
+    On a 429 the wait Telegram asks for is honoured and the send re-queued,
+    up to _MAX_RETRIES times; after that the RetryAfter propagates.
+    """
+    chat_limiter = _chat_limiter(chat_id)
+    for attempt in range(_MAX_RETRIES + 1):
+        if chat_limiter is not None:
+            await chat_limiter.acquire()
+        await EDIT_LIMITER.acquire()
+        try:
+            return await send()
+        except RetryAfter as e:
+            if attempt == _MAX_RETRIES:
+                raise
+            delay = e.retry_after
+            # PTB 20 gives seconds, newer releases a timedelta
+            if hasattr(delay, 'total_seconds'):
+                delay = delay.total_seconds()
+            await asyncio.sleep(delay)
+
+
+async def edit_message(query, text: str, **kwargs):
+    """Edit a callback query's message, paced by the shared rate limiters."""
+    chat_id = query.message.chat_id if query.message else None
+    return await _send(chat_id, lambda: query.edit_message_text(text, **kwargs))
+
+
+async def reply_message(message, text: str, **kwargs):
+    """Reply to a message, paced by the shared rate limiters."""
+    return await _send(message.chat_id, lambda: message.reply_text(text, **kwargs))
+
+
+async def reply_or_edit(update, text: str, **kwargs):
+    """Edit the pressed button's message, or reply when invoked as a command."""
+    if update.callback_query:
+        return await edit_message(update.callback_query, text, **kwargs)
+    return await reply_message(update.message, text, **kwargs)
@@ -5,6 +5,7 @@ All settings with environment variable overrides.
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,6 +48,7 @@ class Config:
     # TRADING SETTINGS
     # ═══════════════════════════════════════════════════════════════════
     TRADING_MODE = os.getenv('TRADING_MODE', 'paper')  # 'paper' or 'live'
+    PAPER_MODE = TRADING_MODE.lower() == 'paper'  # Read on every handler call — resolved once here
     DEFAULT_SLIPPAGE = float(os.getenv('DEFAULT_SLIPPAGE', '2.0'))
     MAX_TRADE_USD = float(os.getenv('MAX_TRADE_USD', '100'))
     MIN_TRADE_USD = float(os.getenv('MIN_TRADE_USD', '1'))
@@ -65,6 +67,7 @@ class Config:
     # ═══════════════════════════════════════════════════════════════════
     POLYMARKET_WS_URL = os.getenv('POLYMARKET_WS_URL', 'wss://ws-subscriptions-clob.polymarket.com/ws/market')
     POSITION_REFRESH_INTERVAL = float(os.getenv('POSITION_REFRESH_INTERVAL', '10'))
+    BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', '5'))  # Seconds a /balance summary is reused
     ENABLE_LIVE_POSITION_UPDATES = os.getenv('ENABLE_LIVE_POSITION_UPDATES', 'true').lower() == 'true'
     
     # ═══════════════════════════════════════════════════════════════════
@@ -114,7 +117,7 @@ class Config:
     @classmethod
     def is_paper_mode(cls) -> bool:
         """Check if running in paper trading mode."""
-        return cls.TRADING_MODE.lower() == 'paper'
+        return cls.PAPER_MODE
     
     @classmethod
     def is_configured(cls) -> bool:
@@ -122,6 +125,7 @@ class Config:
         return bool(cls.TELEGRAM_BOT_TOKEN and cls.POLYGON_PRIVATE_KEY)
     
     @classmethod
+    @lru_cache(maxsize=32)
     def get_sport_emoji(cls, sport: str) -> str:
         """Get emoji for a sport."""
         return cls.SPORT_EMOJIS.get(sport.lower(), '🎯')
@@ -142,7 +146,7 @@ class Config:
         print("\n" + "=" * 50)
         print("🤖 POLYMARKET TELEGRAM BOT")
         print("=" * 50)
-        print(f"📊 Mode: {'PAPER' if cls.is_paper_mode() else '🔴 LIVE'} TRADING")
+        print(f"📊 Mode: {'PAPER' if cls.PAPER_MODE else '🔴 LIVE'} TRADING")
         print(f"⚡ Instant Sell: {'ON' if cls.USE_INSTANT_SELL else 'OFF'}")
         print(f"📡 WebSocket: {'ON' if cls.POLYMARKET_WS_URL else 'OFF'}")
         print(f"📱 Telegram: {'✅' if cls.TELEGRAM_BOT_TOKEN else '❌'}")
@@ -0,0 +1,80 @@
+"""
+TTL Cache
+
+Small in-process cache with per-entry expiry and a size cap.
+Used for short-lived per-chat data that shouldn't live forever
+in PTB's user_data (and its pickle).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Mapping whose entries expire `ttl` seconds after their last write
+    (or last read, when `touch_on_get` is set). Oldest entries are
+    evicted once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600, touch_on_get: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.touch_on_get = touch_on_get
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for key, or default if missing/expired."""
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        now = time.monotonic()
+        if expires_at <= now:
+            del self._data[key]
+            return default
+        if self.touch_on_get:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key with a fresh expiry."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired or not)."""
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def expire(self):
+        """Drop every expired entry."""
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[key]
+
+    def clear(self):
+        """Remove all entries."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
@@ -6,6 +6,7 @@ Supports sub-markets (toss winner, highest scorer, over/under).
 """
 
 import asyncio
+import weakref
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -109,6 +110,71 @@ class OrderResult:
     error: Optional[str] = None
 
 
+@dataclass(frozen=True)
+class WalletSnapshot:
+    """Signing identity of a ClobClient (None where the client doesn't expose it)."""
+    signer: Optional[str] = None
+    funder: Optional[str] = None
+    sig_type: Optional[int] = None
+    host: str = ''
+
+
+# ClobClient -> WalletSnapshot; entries go away with the client, so a session
+# that swaps in a new ClobClient is re-resolved on its next lookup
+_wallet_snapshots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def wallet_snapshot(clob_client) -> WalletSnapshot:
+    """Signer, funder and sig_type of a ClobClient, resolved once per client object."""
+    snap = _wallet_snapshots.get(clob_client)
+    if snap is not None:
+        return snap
+    builder = getattr(clob_client, 'builder', None)
+    try:
+        signer = clob_client.get_address()
+    except Exception:
+        signer = None
+    snap = WalletSnapshot(
+        signer=signer,
+        funder=getattr(builder, 'funder', None),
+        sig_type=getattr(builder, 'sig_type', None),
+        host=getattr(clob_client, 'host', '') or '',
+    )
+    try:
+        _wallet_snapshots[clob_client] = snap
+    except TypeError:  # not weak-referenceable — just don't cache
+        pass
+    return snap
+
+
+_FILL_KEYS = ('size_matched', 'filled', 'filledSize', 'sizeMatched')
+_AVG_PRICE_KEYS = ('avgPrice', 'average_price', 'averagePrice')
+
+
+def _unpack_order_response(resp, default_error: str = 'Order failed') -> tuple:
+    """
+    (success, order_id, error, filled, avg_price) from a post_order response.
+    
+    py-clob may hand back a dict or an object — branch on that once, not per
+    field. filled/avg_price are 0.0 when the response has no fill details,
+    and are only parsed for a successful post — a failed one may carry
+    placeholders there, and its error is what the caller needs.
+    """
+    if isinstance(resp, dict):
+        get = resp.get
+    else:
+        def get(key, default=None):
+            return getattr(resp, key, default)
+    success = get('success', False)
+    order_id = get('orderID', get('order_id', ''))
+    error = get('error', get('errorMsg', default_error))
+    if not success:
+        return success, order_id, error, 0.0, 0.0
+    filled = next((float(v) for k in _FILL_KEYS if (v := get(k, 0))), 0.0)
+    avg_price = next((float(v) for k in _AVG_PRICE_KEYS if (v := get(k, 0))), 0.0)
+    return success, order_id, error, filled, avg_price
+
+
 # ═══════════════════════════════════════════════════════════════════
 # SPORT KEYWORDS - for detection and filtering
 # ═══════════════════════════════════════════════════════════════════
@@ -381,7 +447,7 @@ class PolymarketClient:
     """
     
     def __init__(self):
-        self.is_paper = Config.is_paper_mode()
+        self.is_paper = Config.PAPER_MODE
         self.clob_client = None
         self._paper_balance = 1000.0
         self._paper_positions: Dict[str, Dict] = {}
@@ -749,6 +815,10 @@ class PolymarketClient:
             
             raise
     
+    def snapshot(self) -> Optional[WalletSnapshot]:
+        """Signing identity of this client's ClobClient (None in paper mode)."""
+        return wallet_snapshot(self.clob_client) if self.clob_client else None
+    
     async def get_balance(self) -> float:
         """Get USDC balance available for trading."""
         if self.is_paper or not self.clob_client:
@@ -2239,26 +2309,12 @@ class PolymarketClient:
                 signed = self._clob_call(self.clob_client.create_market_order, order)
                 resp = self._clob_call(self.clob_client.post_order, signed, OrderType.FAK)
                 
-                success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+                # FAK response: size_matched etc. carry the actual fill amount
+                success, order_id, error, filled, avg_price = _unpack_order_response(
+                    resp, 'FAK order failed'
+                )
                 
                 if success:
-                    order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
-                    
-                    # FAK response: check size_matched for actual fill amount
-                    filled = 0.0
-                    for key in ('size_matched', 'filled', 'filledSize', 'sizeMatched'):
-                        val = resp.get(key, 0) if isinstance(resp, dict) else getattr(resp, key, 0)
-                        if val:
-                            filled = float(val)
-                            break
-                    
-                    avg_price = 0.0
-                    for key in ('avgPrice', 'average_price', 'averagePrice'):
-                        val = resp.get(key, 0) if isinstance(resp, dict) else getattr(resp, key, 0)
-                        if val:
-                            avg_price = float(val)
-                            break
-                    
                     print(f"✅ FAK buy filled: {filled} shares @ {avg_price} (attempt {attempt+1})")
                     
                     # Trust API success flag — Polymarket FAK doesn't always
@@ -2271,7 +2327,7 @@ class PolymarketClient:
                         avg_price=avg_price if avg_price else 0
                     )
                 else:
-                    last_error = resp.get('error', resp.get('errorMsg', 'FAK order failed')) if isinstance(resp, dict) else getattr(resp, 'error', getattr(resp, 'errorMsg', 'FAK order failed'))
+                    last_error = error
                     print(f"⚠️ FAK buy attempt {attempt+1} failed: {last_error}")
                     
             except Exception as e:
@@ -2303,10 +2359,9 @@ class PolymarketClient:
                 signed = self._clob_call(self.clob_client.create_order, order_args)
                 resp = self._clob_call(self.clob_client.post_order, signed, OrderType.GTC)
                 
-                success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+                success, order_id, _, _, _ = _unpack_order_response(resp)
                 
                 if success:
-                    order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
                     print(f"✅ GTC buy limit placed at {limit_price*100:.0f}¢")
                     return OrderResult(
                         success=True,
@@ -2369,10 +2424,9 @@ class PolymarketClient:
             # Post as GTC (Good 'Til Cancelled)
             resp = self._clob_call(self.clob_client.post_order, signed, OrderType.GTC)
             
-            success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+            success, order_id, error, _, _ = _unpack_order_response(resp, 'Limit order failed')
             
             if success:
-                order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
                 return OrderResult(
                     success=True,
                     order_id=str(order_id),
@@ -2380,7 +2434,6 @@ class PolymarketClient:
                     avg_price=price
                 )
             else:
-                error = resp.get('error', 'Limit order failed') if isinstance(resp, dict) else getattr(resp, 'error', 'Limit order failed')
                 return OrderResult(success=False, error=str(error))
                 
         except Exception as e:
@@ -2425,10 +2478,9 @@ class PolymarketClient:
             signed = self._clob_call(self.clob_client.create_order, order_args)
             resp = self._clob_call(self.clob_client.post_order, signed, OrderType.GTC)
             
-            success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+            success, order_id, error, _, _ = _unpack_order_response(resp, 'Limit order failed')
             
             if success:
-                order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
                 return OrderResult(
                     success=True,
                     order_id=str(order_id),
@@ -2436,7 +2488,6 @@ class PolymarketClient:
                     avg_price=price
                 )
             else:
-                error = resp.get('error', 'Limit order failed') if isinstance(resp, dict) else getattr(resp, 'error', 'Limit order failed')
                 return OrderResult(success=False, error=str(error))
                 
         except Exception as e:
@@ -2822,28 +2873,13 @@ class PolymarketClient:
                         signed = self._clob_call(self.clob_client.create_market_order, order)
                         resp = self._clob_call(self.clob_client.post_order, signed, order_type)
                         
-                        success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+                        # size_matched etc. carry the actual fill (FAK may be partial)
+                        success, order_id, _, filled, avg_price = _unpack_order_response(resp)
                         
                         if success:
-                            order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
-                            
-                            # Check size_matched for actual fill (FAK may be partial)
-                            filled = 0.0
-                            for key in ('size_matched', 'filled', 'filledSize', 'sizeMatched'):
-                                val = resp.get(key, 0) if isinstance(resp, dict) else getattr(resp, key, 0)
-                                if val:
-                                    filled = float(val)
-                                    break
                             if not filled:
                                 filled = shares
                             
-                            avg_price = 0.0
-                            for key in ('avgPrice', 'average_price', 'averagePrice'):
-                                val = resp.get(key, 0) if isinstance(resp, dict) else getattr(resp, key, 0)
-                                if val:
-                                    avg_price = float(val)
-                                    break
-                            
                             ot_name = 'FAK' if order_type == OrderType.FAK else 'FOK'
                             print(f"✅ {ot_name} sell filled: {filled} shares @ {avg_price}")
                             return OrderResult(
@@ -2879,10 +2915,9 @@ class PolymarketClient:
                             signed = self._clob_call(self.clob_client.create_order, order_args)
                             resp = self._clob_call(self.clob_client.post_order, signed, OrderType.GTC)
                             
-                            success = resp.get('success', False) if isinstance(resp, dict) else getattr(resp, 'success', False)
+                            success, order_id, _, _, _ = _unpack_order_response(resp)
                             
                             if success:
-                                order_id = resp.get('orderID', resp.get('order_id', '')) if isinstance(resp, dict) else getattr(resp, 'orderID', getattr(resp, 'order_id', ''))
                                 print(f"✅ GTC sell placed at {sell_price*100:.0f}¢ (attempt {attempt+1})")
                                 return OrderResult(
                                     success=True,